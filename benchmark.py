@@ -0,0 +1,247 @@
+"""
+Benchmark suite for the pricing engine, ETL stages and feedback I/O.
+
+Synthetic transcript corpora are generated from a fixed seed (varying length,
+task count and city mix), so runs are reproducible across commits. Each bench
+reports p50/p99 latency and throughput; results are written to
+`profiling/bench_<timestamp>.json` together with the git revision.
+
+Run:      python benchmark.py [--quick] [--only price_quote,etl,feedback,parsing]
+Compare:  python benchmark.py --compare profiling/bench_A.json profiling/bench_B.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[0]
+PROFILING_PATH = BASE / "profiling"
+
+CITIES = ["Marseille", "Paris", "Lyon", "Toulouse", "Nice", "Bordeaux"]
+TASK_PHRASES = [
+    "remove the old tiles", "redo the plumbing for the shower", "replace the toilet",
+    "install a vanity", "repaint the walls", "lay new ceramic floor tiles",
+]
+FILLER = [
+    "The client mentioned the light is poor in the morning.",
+    "Access is via a narrow staircase on the third floor.",
+    "They would like the work finished before the holidays.",
+    "Parking nearby is limited during weekdays.",
+    "The previous owner did some DIY work that may need checking.",
+]
+
+
+def make_transcript(rng: random.Random, tasks: int, filler_sentences: int, city: str | None) -> str:
+    parts = [f"Client wants to renovate a {rng.choice([3, 4, 5, 6, 8, 10])} m² bathroom."]
+    parts += [f"They want to {p}." for p in rng.sample(TASK_PHRASES, k=min(tasks, len(TASK_PHRASES)))]
+    parts += [rng.choice(FILLER) for _ in range(filler_sentences)]
+    rng.shuffle(parts)
+    if rng.random() < 0.3:
+        parts.append("Budget-conscious.")
+    if city:
+        parts.append(f"Located in {city}.")
+    return " ".join(parts)
+
+
+def make_corpus(n: int, seed: int = 42, tasks: tuple[int, int] = (1, 6), filler: tuple[int, int] = (0, 4),
+                cities: list[str] | None = None) -> list[str]:
+    """Reproducible corpus; `tasks`/`filler` are inclusive ranges, `cities` the mix to draw from."""
+    rng = random.Random(seed)
+    cities = cities or CITIES
+    return [make_transcript(rng, rng.randint(*tasks), rng.randint(*filler), rng.choice(cities + [None]))
+            for _ in range(n)]
+
+
+CORPORA = {
+    "short": dict(tasks=(1, 2), filler=(0, 0)),
+    "typical": dict(tasks=(2, 6), filler=(0, 4)),
+    "long": dict(tasks=(4, 6), filler=(150, 250)),
+}
+
+
+def summarize(latencies: list[float], items: int | None = None) -> dict:
+    lat = sorted(latencies)
+    total = sum(lat)
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+    return {
+        "n": len(lat),
+        "p50_ms": round(pct(0.50), 4),
+        "p99_ms": round(pct(0.99), 4),
+        "mean_ms": round(statistics.fmean(lat) * 1000, 4),
+        "throughput_per_s": round((items or len(lat)) / total, 1) if total else None,
+    }
+
+
+def timed(fn, args_iter) -> list[float]:
+    out = []
+    for args in args_iter:
+        t0 = time.perf_counter()
+        fn(*args)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_price_quote(n: int) -> dict:
+    from pricing_engine import price_quote, price_quotes, sweep_market
+    results = {}
+    for name, spec in CORPORA.items():
+        corpus = make_corpus(n, seed=7, **spec)
+        price_quote(corpus[0])  # warm caches
+        results[name] = summarize(timed(price_quote, ((t,) for t in corpus)))
+        results[name]["avg_chars"] = round(statistics.fmean(len(t) for t in corpus))
+    corpus = make_corpus(n, seed=7, **CORPORA["typical"])
+    t0 = time.perf_counter()
+    for _ in price_quotes(corpus):
+        pass
+    elapsed = time.perf_counter() - t0
+    results["batch_typical"] = {"n": n, "throughput_per_s": round(n / elapsed, 1) if elapsed else None}
+    # 1,000-cell inflation x shortage x seasonality grid over one quote base
+    grid = {"inflation": [i / 100 for i in range(20)], "shortage": [i / 24 for i in range(25)],
+            "seasonality": ["off", "neutral"]}
+    results["sweep_1000_cells"] = summarize(timed(sweep_market, ((t, grid) for t in corpus[:max(5, n // 10)])))
+    return results
+
+
+def bench_etl(n: int) -> dict:
+    import etl_pipeline
+    from history_store import HistoryStore
+    corpus = make_corpus(n, seed=11, **CORPORA["typical"])
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bronze, silver = tmp / "bronze.json", tmp / "silver.json"
+        store = HistoryStore(tmp / "history")
+        stages = {"bronze_write": [], "silver_transform": [], "gold_generate": []}
+        for i, t in enumerate(corpus):
+            raw = {"transcript": t, "meta": {"seq": i}}
+            stages["bronze_write"] += timed(etl_pipeline.bronze_write, [(raw, bronze)])
+            stages["silver_transform"] += timed(lambda: etl_pipeline.silver_transform(bronze, silver_path=silver), [()])
+            stages["gold_generate"] += timed(lambda: etl_pipeline.gold_generate(silver, store=store), [()])
+        store.close()
+    return {k: summarize(v) for k, v in stages.items()}
+
+
+def bench_feedback(sizes: list[int], events: int) -> dict:
+    """record_feedback cost as history grows; flush_every=1 measures the durable per-event path."""
+    from pricing_logic.feedback_store import FeedbackStore
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "feedback_memory.json"
+            seed = FeedbackStore(path, flush_every=max(1, size), flush_interval=None)
+            for i in range(size):
+                seed.record(f"Q-seed-{i}", i % 3 != 0)
+            seed.compact()
+            seed.close()
+            t0 = time.perf_counter()
+            store = FeedbackStore(path, flush_every=1, flush_interval=None)
+            load_s = time.perf_counter() - t0
+            lat = timed(store.record, ((f"Q-{i}", i % 2 == 0) for i in range(events)))
+            store.close()
+        results[str(size)] = {**summarize(lat), "startup_ms": round(load_s * 1000, 3)}
+    return results
+
+
+def _legacy_parse(text: str):
+    # the per-call re.search(pattern_string) parsing that pricing_logic.parsing replaced
+    import re
+    m = re.search(r'(\d+(?:\.\d+)?)\s*(?:m2|m²|sqm|square meters?)', text, re.I) or \
+        re.search(r'(\d+(?:\.\d+)?)\s*m\s*[²2]', text, re.I)
+    c = re.search(r'located in ([A-Za-zÀ-ÿ\- ]+)', text, re.I)
+    b = bool(re.search(r'budget[- ]?conscious|tight budget|cost sensitive', text, re.I))
+    return (float(m.group(1)) if m else None), (c.group(1).strip() if c else None), b
+
+
+def bench_parsing(n: int) -> dict:
+    """Area/city/budget extraction on long transcripts: precompiled + pre-checked vs per-call re.search."""
+    from pricing_logic import parsing
+
+    def parse(text: str):
+        low = text.lower()
+        return parsing.area_m2(text, low), parsing.city(text, low), parsing.budget_conscious(text, low)
+
+    long = make_corpus(n, seed=5, **CORPORA["long"])
+    # same transcripts with the area, budget and city sentences dropped
+    bare = [". ".join(s for s in t.split(". ") if not any(k in s for k in ("m²", "Budget", "Located")))
+            for t in long]
+    results = {}
+    for name, corpus in (("long", long), ("long_no_fields", bare)):
+        assert all(_legacy_parse(t) == parse(t) for t in corpus)
+        legacy = summarize(timed(_legacy_parse, ((t,) for t in corpus)))
+        shared = summarize(timed(parse, ((t,) for t in corpus)))
+        results[name] = {"legacy": legacy, "parsing": shared,
+                         "speedup_p50": round(legacy["p50_ms"] / shared["p50_ms"], 2) if shared["p50_ms"] else None}
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(only: set[str], quick: bool) -> dict:
+    n = 50 if quick else 500
+    report = {
+        "created_utc": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": {},
+    }
+    if "price_quote" in only:
+        report["results"]["price_quote"] = bench_price_quote(n)
+    if "etl" in only:
+        report["results"]["etl"] = bench_etl(max(10, n // 10))
+    if "parsing" in only:
+        report["results"]["parsing"] = bench_parsing(n)
+    if "feedback" in only:
+        report["results"]["feedback"] = bench_feedback([0, 1000] if quick else [0, 1000, 10000, 100000],
+                                                       events=50 if quick else 200)
+    return report
+
+
+def compare(old_path: Path, new_path: Path) -> list[str]:
+    """Line per metric with relative change of p50 (latency) / throughput between two reports."""
+    old, new = json.loads(Path(old_path).read_text()), json.loads(Path(new_path).read_text())
+    lines = []
+
+    def walk(a, b, prefix):
+        for k, v in b.items():
+            if isinstance(v, dict) and isinstance(a.get(k), dict):
+                walk(a[k], v, f"{prefix}{k}.")
+            elif k in ("p50_ms", "p99_ms", "throughput_per_s") and isinstance(a.get(k), (int, float)) and a[k]:
+                lines.append(f"{prefix}{k}: {a[k]} -> {v} ({(v - a[k]) / a[k] * 100:+.1f}%)")
+
+    walk(old.get("results", {}), new.get("results", {}), "")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", default="price_quote,etl,feedback,parsing")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+    if args.compare:
+        print("\n".join(compare(*args.compare)))
+        return
+    report = run(set(args.only.split(",")), args.quick)
+    out = args.out or PROFILING_PATH / f"bench_{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report["results"], indent=2))
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
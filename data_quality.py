@@ -5,13 +5,14 @@ Generates a small HTML report with basic stats.
 """
 import json, statistics, os
 from pathlib import Path
+import pipeline_config
 
 BASE = Path(__file__).resolve().parents[0]
 CFG = BASE / "config.yaml"
 
 def load_config():
-    import yaml
-    return yaml.safe_load(CFG.read_text())
+    # shared with etl_pipeline: parsed once, re-parsed only when config.yaml changes
+    return pipeline_config.load_config(CFG)
 
 def validate_silver(silver_path):
     data = json.loads(Path(silver_path).read_text())
@@ -6,9 +6,14 @@ ETL pipeline: bronze -> silver -> gold
 - gold: final quote with insights and persisted history
 """
 import json, os, statistics
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from datetime import datetime
-from pricing_engine import price_quote, load_feedback, record_feedback
+import pipeline_config
+from history_store import QuoteRecord, open_store
+from pricing_engine import price_quote, load_feedback, record_feedback, PricingContext
+from pricing_logic import parsing
 from pricing_logic.material_db import MaterialDB
 from pricing_logic.labor_calc import load_task_baselines
 
@@ -16,46 +21,39 @@ BASE = Path(__file__).resolve().parents[0]
 CONFIG = (BASE / "config.yaml")
 
 def load_config():
-    import yaml
-    return yaml.safe_load(CONFIG.read_text())
+    # parsed once and cached; re-parsed only when config.yaml's mtime changes
+    return pipeline_config.load_config(CONFIG)
 
-def bronze_write(raw, path=None):
-    cfg = load_config()
-    p = BASE / (path or cfg["etl"]["bronze"])
+def bronze_write(raw, path=None, cfg=None):
+    cfg = cfg or load_config()
+    p = BASE / (path or cfg.etl.bronze)
     p.parent.mkdir(parents=True, exist_ok=True)
     p.write_text(json.dumps(raw, indent=2, ensure_ascii=False))
     return p
 
-def silver_transform(bronze_path=None):
-    cfg = load_config()
-    p = BASE / (bronze_path or cfg["etl"]["bronze"])
-    raw = json.loads(p.read_text())
-    # Basic cleaning/normalization
+def clean_record(raw: dict) -> dict:
+    """Silver cleaning/normalization of one bronze record."""
     cleaned = {}
     cleaned["transcript"] = raw.get("transcript", "").strip()
-    # normalize area unit: try to extract m2
-    import re
-    m = re.search(r'(\\d+(?:\\.\\d+)?)\\s*(?:m2|m²|sqm|square meters?)', cleaned["transcript"], re.I)
-    if m:
-        cleaned["area_m2"] = float(m.group(1))
-    else:
-        cleaned["area_m2"] = raw.get("area_m2") or None
+    # normalize area unit: same parser as pricing_engine
+    area = parsing.area_m2(cleaned["transcript"])
+    cleaned["area_m2"] = area if area is not None else (raw.get("area_m2") or None)
     cleaned["city"] = raw.get("city") or ""
     cleaned["meta"] = raw.get("meta", {})
+    return cleaned
+
+def silver_transform(bronze_path=None, silver_path=None, cfg=None):
+    cfg = cfg or load_config()
+    p = BASE / (bronze_path or cfg.etl.bronze)
+    raw = json.loads(p.read_text())
+    cleaned = clean_record(raw)
     # write silver
-    out = BASE / cfg["etl"]["silver"]
+    out = BASE / (silver_path or cfg.etl.silver)
     out.parent.mkdir(parents=True, exist_ok=True)
     out.write_text(json.dumps(cleaned, indent=2, ensure_ascii=False))
     return out
 
-def gold_generate(silver_path=None, market=None, scenario="mid"):
-    cfg = load_config()
-    p = BASE / (silver_path or cfg["etl"]["silver"])
-    clean = json.loads(p.read_text())
-    transcript = clean["transcript"]
-    # Use existing price_quote (which returns rich quote) but accept market and scenario
-    mk = market
-    quote = price_quote(transcript, market=mk, scenario=scenario)
+def enrich_gold(quote: dict, scenario: str) -> dict:
     # add ETL metadata
     quote["_etl"] = {"generated_at": datetime.utcnow().isoformat(), "scenario": scenario}
     # insights: simple stats
@@ -64,30 +62,230 @@ def gold_generate(silver_path=None, market=None, scenario="mid"):
         "avg_task_price": round(sum(t["pricing"]["total_price"] for t in zone["tasks"]) / max(1,len(zone["tasks"])),2),
         "task_count": len(zone["tasks"])
     }
-    # persist to history with timestamp
-    hist_prefix = cfg["etl"]["gold_prefix"]
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    hist_path = BASE / f"{hist_prefix}_{ts}.json"
-    hist_path.write_text(json.dumps(quote, indent=2, ensure_ascii=False))
-    return hist_path, quote
-
-def compare_with_previous(new_path):
-    # compare latest two history files by file time (basic)
-    cfg = load_config()
-    hist_dir = BASE / cfg["history_path"]
-    files = sorted(hist_dir.glob("quote_*.json"))
-    if len(files) < 2:
-        return None
-    with open(files[-2]) as f:
-        prev = json.load(f)
-    with open(files[-1]) as f:
-        curr = json.load(f)
+    return quote
+
+def history(cfg=None):
+    """Indexed gold history store under cfg.history_path."""
+    cfg = cfg or load_config()
+    return open_store(BASE / cfg.history_path)
+
+def gold_generate(silver_path=None, market=None, scenario="mid", store=None, cfg=None):
+    """Price the silver record and append it to the history store. Returns (QuoteRecord, quote)."""
+    cfg = cfg or load_config()
+    p = BASE / (silver_path or cfg.etl.silver)
+    clean = json.loads(p.read_text())
+    transcript = clean["transcript"]
+    # Use existing price_quote (which returns rich quote) but accept market and scenario
+    mk = market
+    quote = price_quote(transcript, market=mk, scenario=scenario)
+    enrich_gold(quote, scenario)
+    # persist to indexed history (segment file + index row)
+    store = store or history(cfg)
+    return store.append(quote), quote
+
+def _pct(prev, curr):
+    return round(((curr - prev)/prev)*100, 2) if prev else None
+
+def quote_delta(curr, prev, cfg=None):
+    """Totals and per-task deltas between two comparable QuoteRecords, checked against the quality gate."""
+    cfg = cfg or load_config()
     deltas = {}
     # compare totals
-    prev_tot = prev["totals"]["total_price"]
-    cur_tot = curr["totals"]["total_price"]
-    pct = ((cur_tot - prev_tot)/prev_tot)*100 if prev_tot else None
+    prev_tot = prev.total_price
+    cur_tot = curr.total_price
+    deltas["prev_quote_id"] = prev.quote_id
+    deltas["curr_quote_id"] = curr.quote_id
     deltas["prev_total"] = prev_tot
     deltas["curr_total"] = cur_tot
-    deltas["pct_change"] = round(pct,2) if pct is not None else None
+    deltas["pct_change"] = _pct(prev_tot, cur_tot)
+    prev_tasks, cur_tasks = prev.task_prices, curr.task_prices
+    deltas["tasks"] = {t: {"prev": prev_tasks[t], "curr": cur_tasks[t], "pct_change": _pct(prev_tasks[t], cur_tasks[t])}
+                       for t in cur_tasks if t in prev_tasks}
+    limit = cfg.quality_gate.max_price_change_pct
+    deltas["exceeds_gate"] = deltas["pct_change"] is not None and abs(deltas["pct_change"]) > limit
     return deltas
+
+def _history_record(store, quote):
+    """QuoteRecord for a QuoteRecord, a quote_id, or a legacy quote JSON file path."""
+    if isinstance(quote, QuoteRecord):
+        return quote
+    if isinstance(quote, os.PathLike) or (isinstance(quote, str) and quote.endswith(".json")):
+        quote = json.loads((BASE / quote).read_text())["quote_id"]
+    elif not isinstance(quote, str):
+        raise TypeError(f"expected a QuoteRecord, quote_id or quote file path, got {type(quote).__name__}")
+    rec = store.get(quote)
+    if rec is None:
+        raise KeyError(f"quote {quote!r} is not in the history store")
+    return rec
+
+def compare_with_previous(new_record=None, cfg=None, store=None):
+    # compare a stored quote (default: the latest) with the most recent comparable one
+    # (same city, task set and area bucket) stored before it
+    store = store or history(cfg)
+    curr = next(iter(store.latest(1)), None) if new_record is None else _history_record(store, new_record)
+    prev = store.previous_comparable(curr) if curr else None
+    if prev is None:
+        return None
+    return quote_delta(curr, prev, cfg)
+
+def compare_batch(records, cfg=None, store=None):
+    """
+    Delta report (or None) for each record of a freshly appended batch, in order.
+    The latest record per comparable key is kept in memory, so history is queried
+    at most once per distinct city/task-set/area bucket in the batch.
+    """
+    cfg = cfg or load_config()
+    store = store or history(cfg)
+    latest = {}
+    out = []
+    for rec in records:
+        key = rec.comparable_key
+        prev = latest[key] if key in latest else store.previous_comparable(rec)
+        out.append(quote_delta(rec, prev, cfg) if prev else None)
+        latest[key] = rec
+    return out
+
+
+# --- Streaming bulk mode -------------------------------------------------------
+# Bronze is a JSON-lines file with one raw record per line. Records flow through
+# silver cleaning and gold pricing as generators and gold quotes are appended to
+# a JSON-lines file in chunks, so memory stays constant regardless of input size
+# and no per-record intermediate files are written.
+
+def read_lines(path):
+    with open(BASE / path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def read_jsonl(path):
+    for line in read_lines(path):
+        yield json.loads(line)
+
+def silver_stream(raw_records):
+    for raw in raw_records:
+        yield clean_record(raw)
+
+def gold_record(seq, clean, ctx):
+    quote = price_quote(clean["transcript"], ctx=ctx)
+    quote["quote_id"] = f"{quote['quote_id']}-{seq:06d}"
+    enrich_gold(quote, ctx.scenario)
+    quote["_etl"]["seq"] = seq
+    if clean.get("meta"):
+        quote["_etl"]["meta"] = clean["meta"]
+    return quote
+
+def gold_stream(clean_records, market=None, scenario="mid"):
+    ctx = PricingContext(market, scenario)
+    for i, clean in enumerate(clean_records):
+        yield gold_record(i, clean, ctx)
+
+def write_jsonl(records, out_path, chunk_size=500):
+    """Append records as JSON lines, writing one buffered chunk at a time. Returns the count."""
+    out = BASE / out_path
+    out.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    chunk = []
+    with open(out, "w", encoding="utf-8") as f:
+        for rec in records:
+            chunk.append(json.dumps(rec, ensure_ascii=False))
+            if len(chunk) >= chunk_size:
+                f.write("\n".join(chunk) + "\n")
+                n += len(chunk)
+                chunk = []
+        if chunk:
+            f.write("\n".join(chunk) + "\n")
+            n += len(chunk)
+    return n
+
+def run_streaming(bronze_jsonl, gold_jsonl, market=None, scenario="mid", chunk_size=500):
+    """bronze JSON-lines -> silver -> gold JSON-lines in one constant-memory pass."""
+    written = write_jsonl(gold_stream(silver_stream(read_jsonl(bronze_jsonl)), market, scenario),
+                          gold_jsonl, chunk_size)
+    return {"records": written, "gold_path": str(BASE / gold_jsonl)}
+
+
+# --- Parallel gold stage -------------------------------------------------------
+# Gold pricing is the CPU-bound step. Silver records are cut into chunks and
+# priced on a process pool; each worker builds its PricingContext (reference
+# data, feedback snapshot, margins) once in its initializer. At most
+# `max_inflight` chunks are outstanding, and in ordered mode submission pauses
+# while more than `max_inflight * chunk_size` results wait behind a slow chunk,
+# so memory stays bounded. Silver lines are decoded in the worker; a line that
+# does not parse, or a record that raises, is reported instead of failing the run.
+
+_WORKER_CTX = None
+
+def _gold_worker_init(market, scenario):
+    global _WORKER_CTX
+    _WORKER_CTX = PricingContext(market, scenario)
+
+def _gold_chunk(chunk):
+    out = []
+    for seq, clean in chunk:
+        try:
+            if isinstance(clean, str):
+                clean = json.loads(clean)
+            out.append((seq, gold_record(seq, clean, _WORKER_CTX), None))
+        except Exception as e:
+            out.append((seq, None, f"{type(e).__name__}: {e}"))
+    return out
+
+def gold_parallel(clean_records, market=None, scenario="mid", workers=None, chunk_size=64,
+                  ordered=True, max_inflight=None):
+    """
+    Yield (seq, quote, error) for every silver record (a dict or its JSON line);
+    exactly one of quote/error is set. ordered=True yields in input order,
+    otherwise as chunks complete.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or workers * 2
+    max_pending = max_inflight * chunk_size
+    records = enumerate(clean_records)
+    pending = {}
+    next_seq = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_gold_worker_init,
+                             initargs=(market, scenario)) as pool:
+        inflight = set()
+
+        def top_up():
+            # the chunk holding next_seq is always in flight, so pausing cannot stall
+            while len(inflight) < max_inflight and len(pending) <= max_pending:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    return
+                inflight.add(pool.submit(_gold_chunk, chunk))
+
+        top_up()
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                inflight.discard(fut)
+                results = fut.result()
+                if not ordered:
+                    yield from results
+                else:
+                    pending.update((r[0], r) for r in results)
+            if ordered:
+                while next_seq in pending:
+                    yield pending.pop(next_seq)
+                    next_seq += 1
+            top_up()
+
+def run_parallel_gold(silver_jsonl, gold_jsonl, market=None, scenario="mid", workers=None,
+                      chunk_size=64, ordered=True):
+    """silver JSON-lines -> gold JSON-lines on a process pool. Returns a run report with failures."""
+    failures = []
+
+    def quotes():
+        for seq, quote, error in gold_parallel(read_lines(silver_jsonl), market, scenario,
+                                               workers, chunk_size, ordered):
+            if error is not None:
+                failures.append({"seq": seq, "error": error})
+            else:
+                yield quote
+
+    written = write_jsonl(quotes(), gold_jsonl)
+    return {"records": written + len(failures), "written": written, "failed": len(failures),
+            "failures": failures, "gold_path": str(BASE / gold_jsonl)}
@@ -0,0 +1,115 @@
+"""
+Local fake supplier price API, for exercising supplier adapters without network.
+
+- GET  /prices?sku=TILE-STD-01&city=Paris
+- POST /prices:batch   {"items": [{"sku": "...", "city": "..."}, ...]}  ->  {"prices": [...]}
+
+Prices come from `supplier_stub` unless overridden in `prices` ({(sku, city_key): eur});
+`latency` adds a per-request delay, `fail = True` answers 503, and `calls` counts
+requests so tests can assert on cache behaviour.
+
+Run:  python fake_supplier.py --port 8090
+      PRICING_SUPPLIER_URL=http://127.0.0.1:8090 python pricing_engine.py
+"""
+import argparse
+import json
+import threading
+import time
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pricing_logic.supplier_adapters import city_key
+from pricing_logic.supplier_stub import SupplierQuote, TILE_SKU, get_tile_price
+
+
+class FakeSupplierServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.prices: dict[tuple[str, str], float] = {}
+        self.latency = latency
+        self.fail = False
+        self.calls = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def quote(self, sku: str, city: str | None) -> dict:
+        city = city or None
+        override = self.prices.get((sku, city_key(city)))
+        if override is not None:
+            return asdict(SupplierQuote(sku, f"Fake supplier {sku}", override, city))
+        if sku == TILE_SKU:
+            return asdict(get_tile_price(city))
+        return asdict(SupplierQuote(sku, f"Fake supplier {sku}", 10.0, city))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _begin(self) -> bool:
+                server.calls += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.fail:
+                    self._reply(503, {"error": "supplier unavailable"})
+                    return False
+                return True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/prices":
+                    return self._reply(404, {"error": "not found"})
+                if self._begin():
+                    q = parse_qs(url.query)
+                    self._reply(200, server.quote(q.get("sku", [""])[0], q.get("city", [""])[0]))
+
+            def do_POST(self):
+                if self.path != "/prices:batch":
+                    return self._reply(404, {"error": "not found"})
+                items = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")["items"]
+                if self._begin():
+                    self._reply(200, {"prices": [server.quote(i["sku"], i.get("city")) for i in items]})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeSupplierServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeSupplierServer(args.host, args.port, args.latency)
+    print(f"fake supplier on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Columnar, memory-mapped store of flattened task rows for analytics over history.
+
+`compact()` rolls quotes from the indexed history store into fixed-width NumPy
+columns shaped like the `export_csv()` rows (one row per task), written as `.npy`
+files under `history/columnar/part_NNNNNN/`. Cities, tasks and zones are
+dictionary-encoded to int32 codes kept in `meta.json`. Each compaction only adds
+quotes newer than the last one rolled up, as a new immutable part.
+
+Reads memory-map the parts, so aggregates such as average price per task per
+city or monthly margin drift run as NumPy reductions with no JSON parsing. The
+aggregates reduce each part separately and merge the partial sums, so no column
+is ever copied into one contiguous array.
+
+Run:  python history_columnar.py compact
+      python history_columnar.py report
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from history_store import HistoryStore, open_store
+
+BASE = Path(__file__).resolve().parents[0]
+
+NUMERIC_COLUMNS = {
+    "quote_seq": "i8",
+    "created": "datetime64[s]",
+    "quantity": "f8",
+    "labor_hours": "f8",
+    "labor_cost": "f8",
+    "materials_cost": "f8",
+    "margin": "f8",
+    "vat_rate": "f8",
+    "vat_amount": "f8",
+    "total_price": "f8",
+}
+CODED_COLUMNS = {"zone": "zones", "city": "cities", "task": "tasks"}
+
+
+class ColumnarHistory:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.meta_path = self.root / "meta.json"
+        if self.meta_path.exists():
+            self.meta = json.loads(self.meta_path.read_text())
+        else:
+            self.meta = {"rows": 0, "last_seq": 0, "parts": [], "zones": [], "cities": [], "tasks": []}
+        self._lookup = {d: {v: i for i, v in enumerate(self.meta[d])} for d in CODED_COLUMNS.values()}
+
+    def _code(self, dictionary: str, value) -> int:
+        value = "" if value is None else str(value)
+        codes = self._lookup[dictionary]
+        if value not in codes:
+            codes[value] = len(self.meta[dictionary])
+            self.meta[dictionary].append(value)
+        return codes[value]
+
+    def compact(self, store: HistoryStore, batch: int = 10000) -> int:
+        """Roll quotes with seq > last_seq into a new part. Returns rows written."""
+        rows = {name: [] for name in list(NUMERIC_COLUMNS) + list(CODED_COLUMNS)}
+        last_seq = self.meta["last_seq"]
+        for rec in store.iter_records(batch, after=last_seq):
+            quote = store.load(rec)
+            zone = quote["zones"][0]
+            created = np.datetime64(quote["created_utc"][:19], "s")
+            for t in zone["tasks"]:
+                rows["quote_seq"].append(rec.seq)
+                rows["created"].append(created)
+                rows["zone"].append(self._code("zones", zone.get("zone_name")))
+                rows["city"].append(self._code("cities", zone.get("city")))
+                rows["task"].append(self._code("tasks", t["task"]))
+                rows["quantity"].append(t["quantity"])
+                rows["labor_hours"].append(t["labor"]["hours"])
+                rows["labor_cost"].append(t["labor"]["cost"])
+                rows["materials_cost"].append(t["materials"]["cost"])
+                rows["margin"].append(t["pricing"]["margin"])
+                rows["vat_rate"].append(t["pricing"]["vat_rate"])
+                rows["vat_amount"].append(t["pricing"]["vat_amount"])
+                rows["total_price"].append(t["pricing"]["total_price"])
+            last_seq = rec.seq
+        n = len(rows["quote_seq"])
+        if n:
+            part = f"part_{len(self.meta['parts']) + 1:06d}"
+            (self.root / part).mkdir(parents=True, exist_ok=True)
+            dtypes = {**NUMERIC_COLUMNS, **{c: "i4" for c in CODED_COLUMNS}}
+            for name, values in rows.items():
+                np.save(self.root / part / f"{name}.npy", np.asarray(values, dtype=dtypes[name]))
+            self.meta["parts"].append({"name": part, "rows": n})
+            self.meta["rows"] += n
+        self.meta["last_seq"] = last_seq
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.meta))
+        tmp.replace(self.meta_path)
+        return n
+
+    def parts(self, *names: str):
+        """Yield one tuple of memory-mapped columns per part."""
+        for p in self.meta["parts"]:
+            yield tuple(np.load(self.root / p["name"] / f"{name}.npy", mmap_mode="r") for name in names)
+
+    def column(self, name: str) -> np.ndarray:
+        """Whole column; memory-mapped for a single part, copied into one array otherwise."""
+        cols = [c for c, in self.parts(name)]
+        if not cols:
+            return np.empty(0, dtype=NUMERIC_COLUMNS.get(name, "i4"))
+        return cols[0] if len(cols) == 1 else np.concatenate(cols)
+
+    def avg_price_per_task_city(self) -> list[dict]:
+        n_tasks = max(1, len(self.meta["tasks"]))
+        size = len(self.meta["cities"]) * n_tasks
+        counts = np.zeros(size, dtype="i8")
+        sums = np.zeros(size)
+        for city, task, price in self.parts("city", "task", "total_price"):
+            key = city.astype("i8") * n_tasks + task
+            counts += np.bincount(key, minlength=size)
+            sums += np.bincount(key, weights=price, minlength=size)
+        out = []
+        for k in np.flatnonzero(counts):
+            c, t = divmod(int(k), n_tasks)
+            out.append({"city": self.meta["cities"][c], "task": self.meta["tasks"][t],
+                        "rows": int(counts[k]), "avg_total_price": round(float(sums[k] / counts[k]), 2)})
+        return out
+
+    def margin_drift(self) -> list[dict]:
+        """Mean margin per calendar month, with the change from the previous month."""
+        totals = {}
+        for created, margin in self.parts("created", "margin"):
+            uniq, inv = np.unique(created.astype("datetime64[M]"), return_inverse=True)
+            for m, s, n in zip(uniq, np.bincount(inv, weights=margin), np.bincount(inv)):
+                acc = totals.setdefault(m, [0.0, 0])
+                acc[0] += s
+                acc[1] += n
+        if not totals:
+            return []
+        uniq = sorted(totals)
+        means = np.array([totals[m][0] / totals[m][1] for m in uniq])
+        drift = np.diff(means, prepend=means[0])
+        return [{"month": str(m), "avg_margin": round(float(a), 4), "drift": round(float(d), 4)}
+                for m, a, d in zip(uniq, means, drift)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cmd", choices=["compact", "report"])
+    parser.add_argument("--history", type=Path, default=BASE / "history")
+    args = parser.parse_args()
+    col = ColumnarHistory(args.history / "columnar")
+    if args.cmd == "compact":
+        print(f"compacted {col.compact(open_store(args.history))} task rows")
+    else:
+        print(json.dumps({"avg_price_per_task_city": col.avg_price_per_task_city(),
+                          "margin_drift": col.margin_drift()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
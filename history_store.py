@@ -0,0 +1,231 @@
+"""
+Indexed quote history.
+
+Gold quotes are appended as compact JSON lines to segment files
+(`history/segments/seg_000001.jsonl`, rotated at `segment_bytes`), and a SQLite
+index (`history/index.db`) records quote_id, timestamp, city, task set, area and
+totals plus the segment/offset/length of each body. Lookups such as "latest
+quote" or "previous quote before X" are B-tree index queries; full bodies are
+only read (one seek) when asked for. Each row also carries a comparable key
+(city, task set, area bucket) and per-task totals, so "previous comparable
+quote" and per-task deltas come straight from the index.
+
+Legacy one-file-per-quote history (`history/quote_*.json`) is imported into the
+index the first time a store is opened on a directory.
+"""
+import bisect
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    quote_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    city TEXT,
+    task_key TEXT,
+    area_m2 REAL,
+    net_price REAL,
+    vat_amount REAL,
+    total_price REAL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    comparable_key TEXT,
+    task_totals TEXT
+);
+"""
+INDEXES = """
+DROP INDEX IF EXISTS idx_quotes_city_tasks;
+CREATE INDEX IF NOT EXISTS idx_quotes_ts ON quotes(ts, seq);
+CREATE INDEX IF NOT EXISTS idx_quotes_quote_id ON quotes(quote_id);
+CREATE INDEX IF NOT EXISTS idx_quotes_comparable ON quotes(comparable_key, ts, seq);
+"""
+
+COLUMNS = ("seq", "quote_id", "ts", "city", "task_key", "area_m2",
+           "net_price", "vat_amount", "total_price", "segment", "offset", "length",
+           "comparable_key", "task_totals")
+
+# Upper bounds (m²) of the area buckets used to decide whether two quotes are comparable.
+AREA_BUCKETS = (3.0, 5.0, 8.0, 12.0, 20.0)
+
+
+@dataclass(frozen=True)
+class QuoteRecord:
+    """Index row for one stored quote; the body is loaded lazily via HistoryStore.load()."""
+    seq: int
+    quote_id: str
+    ts: str
+    city: str | None
+    task_key: str
+    area_m2: float | None
+    net_price: float
+    vat_amount: float
+    total_price: float
+    segment: str
+    offset: int
+    length: int
+    comparable_key: str = ""
+    task_totals: str = "{}"
+
+    @property
+    def tasks(self) -> list[str]:
+        return self.task_key.split(",") if self.task_key else []
+
+    @property
+    def task_prices(self) -> dict[str, float]:
+        return json.loads(self.task_totals or "{}")
+
+
+def task_key(quote: dict) -> str:
+    """Canonical task set of a quote: sorted, comma-joined task slugs."""
+    zone = quote["zones"][0]
+    return ",".join(sorted({t["task"] for t in zone["tasks"]}))
+
+
+def area_bucket(area_m2: float | None) -> int:
+    if area_m2 is None:
+        return -1
+    return bisect.bisect_left(AREA_BUCKETS, area_m2)
+
+
+def comparable_key(quote: dict) -> str:
+    """Quotes sharing city, task set and area bucket are comparable for delta checks."""
+    zone = quote["zones"][0]
+    return f"{(zone.get('city') or '').strip().lower()}|{task_key(quote)}|{area_bucket(zone.get('area_m2'))}"
+
+
+def _task_totals(quote: dict) -> str:
+    totals: dict[str, float] = {}
+    for t in quote["zones"][0]["tasks"]:
+        totals[t["task"]] = round(totals.get(t["task"], 0.0) + t["pricing"]["total_price"], 2)
+    return json.dumps(totals, sort_keys=True)
+
+
+class HistoryStore:
+    def __init__(self, root: Path, segment_bytes: int = 64 << 20, import_legacy: bool = True):
+        self.root = Path(root)
+        self.segments_dir = self.root / "segments"
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        fresh = not (self.root / "index.db").exists()
+        self.db = sqlite3.connect(self.root / "index.db", isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.executescript(INDEXES)
+        if fresh and import_legacy:
+            self.import_legacy()
+
+    # writes
+    def _current_segment(self, incoming: int) -> Path:
+        row = self.db.execute("SELECT segment FROM quotes ORDER BY seq DESC LIMIT 1").fetchone()
+        seg = self.segments_dir / (row[0] if row else "seg_000001.jsonl")
+        if seg.exists() and seg.stat().st_size and seg.stat().st_size + incoming > self.segment_bytes:
+            n = int(seg.stem.split("_")[1]) + 1
+            seg = self.segments_dir / f"seg_{n:06d}.jsonl"
+        return seg
+
+    def append(self, quote: dict) -> QuoteRecord:
+        return self.append_many([quote])[0]
+
+    def append_many(self, quotes) -> list[QuoteRecord]:
+        """Append quotes in one transaction (BEGIN IMMEDIATE serializes writers across processes)."""
+        records = []
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for quote in quotes:
+                    data = (json.dumps(quote, ensure_ascii=False) + "\n").encode("utf-8")
+                    seg = self._current_segment(len(data))
+                    with open(seg, "ab") as f:
+                        offset = f.tell()
+                        f.write(data)
+                    records.append(self._index(quote, seg.name, offset, len(data)))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return records
+
+    def _index(self, quote: dict, segment: str, offset: int, length: int) -> QuoteRecord:
+        zone = quote["zones"][0]
+        totals = quote["totals"]
+        row = (quote["quote_id"], quote["created_utc"], zone.get("city"), task_key(quote), zone.get("area_m2"),
+               totals["net_price"], totals["vat_amount"], totals["total_price"], segment, offset, length,
+               comparable_key(quote), _task_totals(quote))
+        cur = self.db.execute(
+            "INSERT INTO quotes (quote_id, ts, city, task_key, area_m2, net_price, vat_amount, total_price, "
+            "segment, offset, length, comparable_key, task_totals) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", row)
+        return QuoteRecord(cur.lastrowid, *row)
+
+    def import_legacy(self, pattern: str = "quote_*.json") -> int:
+        files = sorted(self.root.glob(pattern))
+        quotes = []
+        for p in files:
+            try:
+                quotes.append(json.loads(p.read_text()))
+            except (ValueError, OSError):
+                continue
+        quotes.sort(key=lambda q: q.get("created_utc", ""))
+        return len(self.append_many(quotes)) if quotes else 0
+
+    # reads
+    def _records(self, sql: str, params=()) -> list[QuoteRecord]:
+        return [QuoteRecord(*r) for r in self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM quotes {sql}", params)]
+
+    def latest(self, n: int = 1) -> list[QuoteRecord]:
+        """Most recent n quotes, newest first."""
+        return self._records("ORDER BY ts DESC, seq DESC LIMIT ?", (n,))
+
+    def get(self, quote_id: str) -> QuoteRecord | None:
+        rows = self._records("WHERE quote_id = ? ORDER BY seq DESC LIMIT 1", (quote_id,))
+        return rows[0] if rows else None
+
+    def previous(self, record: QuoteRecord) -> QuoteRecord | None:
+        """The quote stored immediately before `record` in time order."""
+        rows = self._records("WHERE (ts, seq) < (?, ?) ORDER BY ts DESC, seq DESC LIMIT 1",
+                             (record.ts, record.seq))
+        return rows[0] if rows else None
+
+    def previous_comparable(self, record: QuoteRecord) -> QuoteRecord | None:
+        """Most recent quote before `record` with the same city, task set and area bucket."""
+        rows = self._records("WHERE comparable_key = ? AND (ts, seq) < (?, ?) ORDER BY ts DESC, seq DESC LIMIT 1",
+                             (record.comparable_key, record.ts, record.seq))
+        return rows[0] if rows else None
+
+    def count(self) -> int:
+        return self.db.execute("SELECT count(*) FROM quotes").fetchone()[0]
+
+    def load(self, record: QuoteRecord) -> dict:
+        """Read one full quote body from its segment."""
+        with open(self.segments_dir / record.segment, "rb") as f:
+            f.seek(record.offset)
+            return json.loads(f.read(record.length))
+
+    def iter_records(self, batch: int = 1000, after: int = 0):
+        """Records with seq > after, in seq order, fetched `batch` index rows at a time."""
+        last = after
+        while True:
+            rows = self._records("WHERE seq > ? ORDER BY seq LIMIT ?", (last, batch))
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1].seq
+
+    def close(self):
+        self.db.close()
+
+
+_STORES: dict[Path, HistoryStore] = {}
+
+
+def open_store(root: Path) -> HistoryStore:
+    """Process-wide store per history directory."""
+    root = Path(root).resolve()
+    if root not in _STORES:
+        _STORES[root] = HistoryStore(root)
+    return _STORES[root]
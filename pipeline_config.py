@@ -0,0 +1,111 @@
+"""
+Shared, parsed-once configuration for the ETL pipeline and data quality gate.
+
+`load_config()` parses config.yaml into a frozen, type-checked PipelineConfig and
+caches it per path. Each call re-stats the file and re-parses only when its mtime
+changed, so edits are picked up without a restart. Sections support both
+attribute access (`cfg.etl.bronze`) and the legacy dict style (`cfg["etl"]["bronze"]`).
+Unknown keys are ignored, so older files that still set `etl.gold_prefix` (gold
+quotes now live in the history store) keep loading.
+"""
+import threading
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[0]
+CONFIG_PATH = BASE / "config.yaml"
+
+
+class _Section:
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+@dataclass(frozen=True)
+class EtlConfig(_Section):
+    bronze: str = "data/bronze_raw.json"
+    silver: str = "data/silver_clean.json"
+
+
+@dataclass(frozen=True)
+class MarginConfig(_Section):
+    default: float = 0.18
+    min: float = 0.12
+    max: float = 0.30
+
+
+@dataclass(frozen=True)
+class QualityGateConfig(_Section):
+    max_price_change_pct: float = 25.0
+
+
+@dataclass(frozen=True)
+class AlertingConfig(_Section):
+    enabled: bool = False
+    slack_webhook: str = ""
+
+
+@dataclass(frozen=True)
+class PipelineConfig(_Section):
+    default_currency: str = "EUR"
+    history_path: str = "history"
+    profiling_path: str = "profiling"
+    hourly_rate_eur: float = 48.0
+    etl: EtlConfig = EtlConfig()
+    margin: MarginConfig = MarginConfig()
+    quality_gate: QualityGateConfig = QualityGateConfig()
+    alerting: AlertingConfig = AlertingConfig()
+
+
+def _build(cls, data, where: str):
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError(f"config: '{where or 'root'}' must be a mapping, got {type(data).__name__}")
+    kwargs = {}
+    for f in fields(cls):
+        if f.name not in data:
+            continue
+        value, key = data[f.name], f"{where}.{f.name}" if where else f.name
+        default = f.default
+        if isinstance(default, _Section):
+            value = _build(type(default), value, key)
+        elif isinstance(default, bool):
+            if not isinstance(value, bool):
+                raise ValueError(f"config: '{key}' must be a boolean, got {value!r}")
+        elif isinstance(default, float):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"config: '{key}' must be a number, got {value!r}")
+            value = float(value)
+        elif isinstance(default, str):
+            if not isinstance(value, str):
+                raise ValueError(f"config: '{key}' must be a string, got {value!r}")
+        kwargs[f.name] = value
+    return cls(**kwargs)
+
+
+def parse_config(text: str) -> PipelineConfig:
+    import yaml
+    return _build(PipelineConfig, yaml.safe_load(text), "")
+
+
+_CACHE: dict[Path, tuple[float, PipelineConfig]] = {}
+_LOCK = threading.Lock()
+
+
+def load_config(path: Path = CONFIG_PATH) -> PipelineConfig:
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    cached = _CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _LOCK:
+        cfg = parse_config(path.read_text())
+        _CACHE[path] = (mtime, cfg)
+    return cfg
@@ -1,15 +1,21 @@
 
-import json, re, math, argparse, logging, csv
+import json, math, argparse, logging, csv, os
 from pathlib import Path
 from datetime import datetime
+from dataclasses import dataclass
 
-from pricing_logic.material_db import MaterialDB
-from pricing_logic.labor_calc import estimate, city_multiplier, LaborRate
-from pricing_logic import labor_calc
+from pricing_logic.labor_calc import estimate, LaborRate
 from pricing_logic.vat_rules import vat_for_task
+from pricing_logic import parsing
+from pricing_logic import pricing_graph
 from pricing_logic.pricing_graph import topo_sort, implied_requirements
-from pricing_logic.supplier_stub import get_tile_price
+from pricing_logic.supplier_stub import SupplierQuote, TILE_SKU, get_tile_price
+from pricing_logic.supplier_adapters import AnchorResolver, CachedSupplier, SupplierError, get_supplier
 from pricing_logic.market import Market
+from pricing_logic.reference_data import ReferenceData, get_reference_data
+from pricing_logic.feedback_store import FeedbackStore, SQLiteFeedbackStore
+from pricing_logic.phrase_matcher import PhraseMatcher, PhraseMatch
+from pricing_logic.instrumentation import span, collect_timings
 
 OUTPUT_PATH = Path(__file__).resolve().parents[0] / "output" / "sample_quote.json"
 LOG_PATH = Path(__file__).resolve().parents[0] / "logs" / "engine.log"
@@ -19,6 +25,8 @@ DATA_PATH = Path(__file__).resolve().parents[0] / "data"
 
 # Simple feedback memory file
 FEEDBACK_PATH = DATA_PATH / "feedback_memory.json"
+# Set to a .db path to share feedback across workers through SQLite instead
+FEEDBACK_DB_ENV = "PRICING_FEEDBACK_DB"
 
 DEFAULT_MARGIN = 0.18           # 18% blended margin
 MIN_MARGIN = 0.12               # protect minimum
@@ -34,32 +42,31 @@ TASK_MAP = {
 }
 
 def infer_area_m2(text: str) -> float | None:
-    m = re.search(r'(\d+(?:\.\d+)?)\s*(?:m2|m²|sqm|square meters?)', text, re.I)
-    if m:
-        return float(m.group(1))
-    # fallback for "small 4m²" style
-    m = re.search(r'(\d+(?:\.\d+)?)\s*m\s*[²2]', text, re.I)
-    return float(m.group(1)) if m else None
+    return parsing.area_m2(text)
 
 def infer_city(text: str) -> str | None:
-    m = re.search(r'located in ([A-Za-zÀ-ÿ\- ]+)', text, re.I)
-    return m.group(1).strip() if m else None
+    return parsing.city(text)
 
 def is_budget_conscious(text: str) -> bool:
-    return bool(re.search(r'budget[- ]?conscious|tight budget|cost sensitive', text, re.I))
+    return parsing.budget_conscious(text)
+
+# Built once from TASK_MAP; call rebuild_task_matcher() after changing the map.
+TASK_MATCHER = PhraseMatcher(TASK_MAP)
+
+def rebuild_task_matcher():
+    global TASK_MATCHER
+    TASK_MATCHER = PhraseMatcher(TASK_MAP)
 
 def detect_tasks(text: str) -> list[str]:
-    tasks = set()
-    low = text.lower()
-    for t, phrases in TASK_MAP.items():
-        for p in phrases:
-            if p in low:
-                tasks.add(t)
-                break
-    # heuristic extras
-    if "toilet" in low: tasks.add("toilet_replace")
-    if "vanity" in low: tasks.add("vanity_install")
-    return list(tasks)
+    return _tasks_from_matches(TASK_MATCHER.find_all(text))
+
+def detect_task_matches(text: str) -> list[PhraseMatch]:
+    """Every TASK_MAP phrase hit with its offsets in the lowercased text, for explainability."""
+    return TASK_MATCHER.find_all(text)
+
+def _tasks_from_matches(matches: list[PhraseMatch]) -> list[str]:
+    # "toilet" / "vanity" are themselves TASK_MAP phrases, covering the bare-keyword heuristics
+    return list({m.label for m in matches})
 
 def wall_area_from_bath(area_m2: float) -> float:
     # Approximate wall paintable area for a small bath: 2.2m height, 60% perimeter exposed.
@@ -75,60 +82,89 @@ def quantity_for_task(task: str, area_m2: float) -> float:
     # "each" tasks
     return 1.0
 
-def suspicious_flags(text: str) -> list[str]:
-    flags = []
-    if "kitchen" in text.lower() and "bath" in text.lower():
-        flags.append("Mixed scopes (kitchen+bath) in one room")
-    if not infer_area_m2(text):
-        flags.append("Missing area")
-    if not detect_tasks(text):
-        flags.append("No recognized tasks")
-    return flags
-
-def confidence_score(text: str) -> float:
+@dataclass(frozen=True)
+class TranscriptFeatures:
+    """Everything the engine reads from a transcript, extracted in one pass."""
+    area_m2: float | None
+    city: str | None
+    tasks: tuple[str, ...]
+    budget_conscious: bool
+    mixed_scope: bool
+    task_matches: tuple[PhraseMatch, ...] = ()
+
+    @property
+    def flags(self) -> list[str]:
+        flags = []
+        if self.mixed_scope:
+            flags.append("Mixed scopes (kitchen+bath) in one room")
+        if not self.area_m2:
+            flags.append("Missing area")
+        if not self.tasks:
+            flags.append("No recognized tasks")
+        return flags
+
+def extract_features(text: str) -> TranscriptFeatures:
+    low = text.lower()
+    matches = TASK_MATCHER.find_all(low, lowered=True)
+    return TranscriptFeatures(
+        area_m2=parsing.area_m2(text, low),
+        city=parsing.city(text, low),
+        tasks=tuple(_tasks_from_matches(matches)),
+        budget_conscious=parsing.budget_conscious(text, low),
+        mixed_scope="kitchen" in low and "bath" in low,
+        task_matches=tuple(matches),
+    )
+
+def suspicious_flags(text: str, features: TranscriptFeatures | None = None) -> list[str]:
+    return (features or extract_features(text)).flags
+
+def confidence_score(text: str, features: TranscriptFeatures | None = None) -> float:
+    f = features or extract_features(text)
     score = 0.5
-    if infer_area_m2(text): score += 0.2
-    if detect_tasks(text): score += 0.2
-    if infer_city(text): score += 0.05
-    if is_budget_conscious(text): score += 0.05
-    flags = suspicious_flags(text)
+    if f.area_m2: score += 0.2
+    if f.tasks: score += 0.2
+    if f.city: score += 0.05
+    if f.budget_conscious: score += 0.05
+    flags = f.flags
     score -= min(len(flags) * 0.1, 0.3)
     return max(0.0, min(1.0, round(score, 2)))
 
+_FEEDBACK_STORE: FeedbackStore | SQLiteFeedbackStore | None = None
+
+def feedback_store() -> FeedbackStore | SQLiteFeedbackStore:
+    """Process-wide feedback store: SQLite if PRICING_FEEDBACK_DB is set, else FEEDBACK_PATH."""
+    global _FEEDBACK_STORE
+    if _FEEDBACK_STORE is None:
+        db = os.environ.get(FEEDBACK_DB_ENV)
+        _FEEDBACK_STORE = SQLiteFeedbackStore(Path(db)) if db else FeedbackStore(FEEDBACK_PATH)
+    return _FEEDBACK_STORE
+
+def set_feedback_store(store: FeedbackStore | SQLiteFeedbackStore | None):
+    global _FEEDBACK_STORE
+    if _FEEDBACK_STORE is not None and _FEEDBACK_STORE is not store:
+        _FEEDBACK_STORE.close()
+    _FEEDBACK_STORE = store
+
 def load_feedback():
-    if FEEDBACK_PATH.exists():
-        try:
-            return json.loads(FEEDBACK_PATH.read_text())
-        except Exception:
-            return {}
-    return {}
+    return feedback_store().snapshot()
 
 
 def per_city_task_multiplier(city: str, task: str) -> float:
-    fb = load_feedback()
     key = f"{city.lower()}::{task}"
-    data = fb.get("per_city_task", {}).get(key, {})
     # Learned multiplier bounded in [0.85, 1.15]
-    return max(0.85, min(1.15, data.get("multiplier", 1.0)))
+    return max(0.85, min(1.15, feedback_store().multiplier(key)))
 
 def learn_city_task_multiplier(city: str, task: str, actual_hours: float, estimated_hours: float):
-    fb = load_feedback()
     key = f"{city.lower()}::{task}"
-    fb.setdefault("per_city_task", {}).setdefault(key, {"multiplier": 1.0, "n": 0})
-    rec = fb["per_city_task"][key]
     ratio = (actual_hours / estimated_hours) if estimated_hours > 0 else 1.0
     # Exponential moving average with mild learning rate
-    rec["multiplier"] = max(0.85, min(1.15, 0.8 * rec["multiplier"] + 0.2 * ratio))
-    rec["n"] = rec.get("n", 0) + 1
-    FEEDBACK_PATH.write_text(json.dumps(fb, indent=2))
+    feedback_store().learn(key, ratio)
 
 def apply_feedback_tweaks(margin: float) -> float:
-    fb = load_feedback()
     # naive scheme: if last 5 quotes mostly rejected, reduce margin slightly
-    hist = fb.get("history", [])[-5:]
-    if not hist:
+    accept_ratio = feedback_store().accept_ratio(5)
+    if accept_ratio is None:
         return margin
-    accept_ratio = sum(1 for h in hist if h.get("accepted")) / len(hist)
     if accept_ratio < 0.4:
         margin = max(MIN_MARGIN, margin - 0.02)
     elif accept_ratio > 0.8:
@@ -136,40 +172,167 @@ def apply_feedback_tweaks(margin: float) -> float:
     return margin
 
 def record_feedback(quote_id: str, accepted: bool):
-    fb = load_feedback()
-    fb.setdefault("history", []).append({
-        "quote_id": quote_id,
-        "accepted": accepted,
-        "ts": datetime.utcnow().isoformat()
-    })
-    FEEDBACK_PATH.write_text(json.dumps(fb, indent=2))
-
-def price_quote(transcript: str, market: Market | None = None, scenario: str = "mid") -> dict:
-    area = infer_area_m2(transcript) or 4.0
-    city = infer_city(transcript) or "Marseille"
-    tasks = detect_tasks(transcript)
-    tasks = list(dict.fromkeys(tasks + implied_requirements(tasks)))
-    tasks = topo_sort(tasks)
-    if not tasks:
-        tasks = ["tiling_floor","painting_walls"]  # sensible defaults
-
-    budget_mode = is_budget_conscious(transcript)
-    market = market or Market()
-    scen = scenario_multipliers(scenario)
+    feedback_store().record(quote_id, accepted)
+
+def supplier_tile_anchor(city: str | None, supplier: CachedSupplier | None = None) -> SupplierQuote:
+    """Cached supplier tile price for a city; the demo stub answers if the supplier is down."""
+    try:
+        return (supplier or get_supplier()).get_price(TILE_SKU, city)
+    except SupplierError:
+        return get_tile_price(city)
+
+class PricingContext:
+    """
+    Setup shared by every quote priced under one market: reference data, scenario
+    factors, feedback-adjusted margins and per-city lookups (city index, supplier
+    anchor, learned task multipliers). Feedback is read once per context, so a
+    batch prices against a consistent snapshot.
+    """
+    def __init__(self, market: Market | None = None, scenario: str = "mid",
+                 ref: ReferenceData | None = None, supplier: CachedSupplier | None = None):
+        self.market = market or Market()
+        self.scenario = scenario
+        self.ref = ref or get_reference_data()
+        self.supplier = supplier or get_supplier()
+        self.history_accept_ratio = feedback_store().accept_ratio(10)
+        self._scenarios: dict[str, dict] = {}
+        self._margins: dict[tuple[str, bool], float] = {}
+        self._cities: dict[str, dict] = {}
+        self._features: dict[str, TranscriptFeatures] = {}
+
+    @property
+    def scen(self) -> dict:
+        return self.scenario_factors(self.scenario)
+
+    def scenario_factors(self, scenario: str) -> dict:
+        if scenario not in self._scenarios:
+            self._scenarios[scenario] = scenario_multipliers(scenario)
+        return self._scenarios[scenario]
+
+    def margin(self, budget_mode: bool, scenario: str | None = None) -> float:
+        scenario = scenario or self.scenario
+        key = (scenario, budget_mode)
+        if key not in self._margins:
+            margin = DEFAULT_MARGIN * (0.9 if budget_mode else 1.0)
+            margin += self.market.margin_bump() + self.scenario_factors(scenario)['margin']
+            margin = max(MIN_MARGIN, min(MAX_MARGIN, margin))
+            self._margins[key] = apply_feedback_tweaks(margin)
+        return self._margins[key]
+
+    def margin_array(self, budget_mode: bool, bump, scenario: str | None = None):
+        """margin() for an array of market margin bumps (one per sampled market)."""
+        import numpy as np
+        margin = DEFAULT_MARGIN * (0.9 if budget_mode else 1.0)
+        margin = np.clip(margin + (bump + self.scenario_factors(scenario or self.scenario)['margin']),
+                         MIN_MARGIN, MAX_MARGIN)
+        # feedback tweaks are a step function of one ratio; apply per distinct value
+        uniq, inv = np.unique(margin, return_inverse=True)
+        return np.array([apply_feedback_tweaks(float(m)) for m in uniq])[inv].reshape(margin.shape)
+
+    def city(self, city: str) -> dict:
+        c = self._cities.get(city)
+        if c is None:
+            c = self._cities[city] = {"city_index": self.ref.city_multiplier(city),
+                                      "supplier": None, "task_multipliers": {}}
+        return c
+
+    def features(self, transcript: str) -> TranscriptFeatures:
+        feats = self._features.get(transcript)
+        return feats if feats is not None else extract_features(transcript)
+
+    def preset_features(self, transcript: str, feats: TranscriptFeatures):
+        """Use features already extracted (e.g. while resolving anchors) instead of re-parsing."""
+        self._features[transcript] = feats
+
+    def preset_anchors(self, city: str, anchors: dict[str, SupplierQuote]):
+        """Use anchors resolved up front (see resolve_anchors) instead of asking the supplier."""
+        if "tiling_floor" in anchors:
+            self.city(city)["supplier"] = anchors["tiling_floor"]
+
+    def supplier_tile_price(self, city: str):
+        c = self.city(city)
+        if c["supplier"] is None:
+            c["supplier"] = supplier_tile_anchor(city, self.supplier)
+        return c["supplier"]
+
+    def task_multiplier(self, city: str, task: str) -> float:
+        lms = self.city(city)["task_multipliers"]
+        if task not in lms:
+            lms[task] = per_city_task_multiplier(city, task)
+        return lms[task]
+
+@dataclass
+class QuoteBase:
+    """Scenario-independent part of a quote: parsed transcript and per-task base costs
+    before market and scenario multipliers."""
+    transcript: str
+    features: TranscriptFeatures
+    area: float
+    city: str
+    budget_mode: bool
+    lines: list[dict]   # task, qty, material (base EUR), hours, labor (base EUR)
+
+def quote_city(feats: TranscriptFeatures) -> str:
+    return feats.city or "Marseille"
+
+def quote_tasks(feats: TranscriptFeatures) -> list[str]:
+    """Detected tasks plus implied prerequisites, in dependency order."""
+    tasks = list(feats.tasks)
+    tasks = topo_sort(list(dict.fromkeys(tasks + implied_requirements(tasks))))
+    return tasks or ["tiling_floor","painting_walls"]  # sensible defaults
+
+# Tasks whose material cost is blended with a supplier anchor in quote_base
+PRICED_ANCHORS = ("tiling_floor",)
+
+async def resolve_anchors(transcript: str, resolver: AnchorResolver,
+                          feats: TranscriptFeatures | None = None) -> tuple[str, dict[str, SupplierQuote]]:
+    """(city, {task: supplier anchor}) for the anchored tasks this transcript will be priced with."""
+    feats = feats or extract_features(transcript)
+    tasks = [t for t in quote_tasks(feats) if t in PRICED_ANCHORS]
+    return quote_city(feats), await resolver.resolve(tasks, quote_city(feats))
+
+def quote_base(transcript: str, ctx: PricingContext) -> QuoteBase:
+    ref = ctx.ref
+    with span("parse"):
+        feats = ctx.features(transcript)
+    area = feats.area_m2 or 4.0
+    city = quote_city(feats)
+    with span("graph"):
+        tasks = quote_tasks(feats)
+
+    lines = []
+    for task in tasks:
+        qty = quantity_for_task(task, area)
+        with span("task.material"):
+            material_cost = ref.materials.cost(task, qty)
+            if task == 'tiling_floor':
+                supplier = ctx.supplier_tile_price(city)
+                # Blend internal DB with supplier anchor (70/30)
+                per_unit = material_cost / max(qty,1.0)
+                blended = 0.7 * per_unit + 0.3 * supplier.unit_price_eur
+                material_cost = blended * qty
+        with span("task.labor"):
+            # learnable per-city-task multiplier on hours
+            lm = ctx.task_multiplier(city, task)
+            labor_cost, hours = estimate(task, qty, city=city, complexity=lm, rate=LaborRate(), ref=ref)
+        lines.append({"task": task, "qty": qty, "material": material_cost, "hours": hours, "labor": labor_cost})
+    return QuoteBase(transcript, feats, area, city, feats.budget_conscious, lines)
+
+def finalize_quote(base: QuoteBase, ctx: PricingContext, scenario: str | None = None) -> dict:
+    """Apply market and scenario multipliers, margin and VAT to a QuoteBase."""
+    scenario = scenario or ctx.scenario
+    market, scen, mdb = ctx.market, ctx.scenario_factors(scenario), ctx.ref.materials
+    feats, city, budget_mode = base.features, base.city, base.budget_mode
 
     # Margin policy
-    margin = DEFAULT_MARGIN * (0.9 if budget_mode else 1.0)
-    margin += market.margin_bump() + scen['margin']
-    margin = max(MIN_MARGIN, min(MAX_MARGIN, margin))
-    margin = apply_feedback_tweaks(margin)
+    with span("margin"):
+        margin = ctx.margin(budget_mode, scenario)
 
-    # Pricing
-    mdb = MaterialDB()
     zone = {
         "zone_name": "Bathroom",
-        "area_m2": area,
+        "area_m2": base.area,
         "city": city,
-        "city_index": city_multiplier(city),
+        "city_index": ctx.city(city)["city_index"],
         "tasks": []
     }
 
@@ -177,25 +340,14 @@ def price_quote(transcript: str, market: Market | None = None, scenario: str = "
     total_vat = 0.0
     total_gross = 0.0
 
-    for task in tasks:
-        qty = quantity_for_task(task, area)
-        # If budget-conscious, slightly reduce material spec cost for tiles/vanity
-        material_cost = mdb.cost(task, qty)
-        if task == 'tiling_floor':
-            supplier = get_tile_price(city)
-            # Blend internal DB with supplier anchor (70/30)
-            per_unit = material_cost / max(qty,1.0)
-            blended = 0.7 * per_unit + 0.3 * supplier.unit_price_eur
-            material_cost = blended * qty
+    for line in base.lines:
+        task, qty, hours = line["task"], line["qty"], line["hours"]
         # Scenario & market effects on materials
-        material_cost *= market.material_multiplier() * scen['material']
+        material_cost = line["material"] * (market.material_multiplier() * scen['material'])
+        # If budget-conscious, slightly reduce material spec cost for tiles/vanity
         if budget_mode and task in ("tiling_floor","vanity_install","toilet_replace"):
             material_cost *= 0.9  # cheaper spec
-
-        # learnable per-city-task multiplier on hours
-        lm = per_city_task_multiplier(city, task)
-        labor_cost, hours = estimate(task, qty, city=city, complexity=lm, rate=LaborRate())
-        labor_cost *= market.labor_multiplier() * scen['labor']
+        labor_cost = line["labor"] * (market.labor_multiplier() * scen['labor'])
 
         net = (material_cost + labor_cost) * (1.0 + margin)
         vat_rate = vat_for_task(task, {"city": city})
@@ -228,6 +380,14 @@ def price_quote(transcript: str, market: Market | None = None, scenario: str = "
         total_vat += vat_amt
         total_gross += gross
 
+    with span("schedule"):
+        plan = pricing_graph.COMPILED.schedule({t["task"]: t["estimated_duration_days"] for t in zone["tasks"]})
+        zone["schedule"] = {
+            "makespan_days": plan.makespan,
+            "critical_path": list(plan.critical_path),
+            "tasks": {t: {"start_day": s, "end_day": e} for t, (s, e) in plan.windows.items()},
+        }
+
     quote = {
         "quote_id": f"Q-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
         "created_utc": datetime.utcnow().isoformat(),
@@ -240,23 +400,160 @@ def price_quote(transcript: str, market: Market | None = None, scenario: str = "
             "total_price": round(total_gross,2)
         },
         "assumptions": {
-            "transcript_area_m2": infer_area_m2(transcript),
-            "defaults_applied": True if not infer_area_m2(transcript) else False,
+            "transcript_area_m2": feats.area_m2,
+            "defaults_applied": True if not feats.area_m2 else False,
             "budget_conscious": budget_mode,
             "city": city
         },
         "confidence": {
-            "score": confidence_score(transcript),
-            "flags": suspicious_flags(transcript)
+            "score": confidence_score(base.transcript, feats),
+            "flags": feats.flags
         }
     }
     # Compute trust score post-assembly
-    quote['trust'] = advanced_trust_score(quote)
+    with span("trust"):
+        quote['trust'] = advanced_trust_score(quote, history_accept_ratio=ctx.history_accept_ratio)
     return quote
 
+def price_quote(transcript: str, market: Market | None = None, scenario: str = "mid",
+                ref: ReferenceData | None = None, ctx: PricingContext | None = None,
+                timings: bool = False) -> dict:
+    """`timings=True` adds a `_timings` block (ms per span) to the returned quote."""
+    if timings:
+        with collect_timings() as spans:
+            quote = price_quote(transcript, market, scenario, ref, ctx)
+        quote["_timings"] = {k: round(v * 1000, 4) for k, v in spans.items()}
+        return quote
+    with span("setup"):
+        ctx = ctx or PricingContext(market, scenario, ref)
+    return finalize_quote(quote_base(transcript, ctx), ctx)
+
+def price_scenarios(transcript: str, market: Market | None = None,
+                    scenarios=("low","mid","high"), ref: ReferenceData | None = None) -> dict:
+    """
+    Price several scenarios in one pass: the transcript is parsed and task base
+    costs computed once, then each scenario only re-applies its material, labor
+    and margin factors. Returns {scenario: quote}.
+    """
+    ctx = PricingContext(market, ref=ref)
+    base = quote_base(transcript, ctx)
+    return {scen: finalize_quote(base, ctx, scen) for scen in scenarios}
+
+@dataclass(frozen=True)
+class SimulationSpec:
+    """Spread of the sampled market around the quote's Market, for simulate_quote()."""
+    inflation_sd: float = 0.02          # normal, around market.inflation
+    shortage_sd: float = 0.10           # normal around market.shortage, clipped to 0..1
+    seasonality: dict | None = None     # e.g. {"off": 0.3, "neutral": 0.5, "peak": 0.2}; None keeps the market's
+    hours_cv: float = 0.15              # per-task hours spread (lognormal, mean 1)
+
+def _base_arrays(base: QuoteBase, ctx: PricingContext, scenario: str):
+    # per-task material/labor before market multipliers, and VAT rates, as in finalize_quote
+    scen = ctx.scenario_factors(scenario)
+    material, labor, vat = [], [], []
+    for line in base.lines:
+        m = line["material"] * scen['material']
+        if base.budget_mode and line["task"] in ("tiling_floor","vanity_install","toilet_replace"):
+            m *= 0.9
+        material.append(m)
+        labor.append(line["labor"] * scen['labor'])
+        vat.append(vat_for_task(line["task"], {"city": base.city}))
+    return material, labor, vat
+
+def _percentiles(values) -> dict:
+    import numpy as np
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return {"p10": round(float(p10), 2), "p50": round(float(p50), 2), "p90": round(float(p90), 2),
+            "mean": round(float(values.mean()), 2)}
+
+def simulate_quote(transcript: str, samples: int = 10000, seed: int | None = 0, market: Market | None = None,
+                   scenario: str = "mid", spec: SimulationSpec = SimulationSpec(),
+                   ref: ReferenceData | None = None) -> dict:
+    """
+    Monte Carlo pricing: the transcript is parsed and task base costs computed once,
+    then `samples` markets (inflation, shortage, seasonality) and per-task hour
+    factors are drawn from a seeded RNG and priced in one vectorized pass.
+    Returns P10/P50/P90 totals next to the deterministic quote total.
+    """
+    if samples < 1:
+        raise ValueError(f"samples must be at least 1, got {samples}")
+    import numpy as np
+    from pricing_logic.vector_pricing import market_totals
+    ctx = PricingContext(market, scenario, ref)
+    base = quote_base(transcript, ctx)
+    rng = np.random.default_rng(seed)
+    m = ctx.market
+    if spec.seasonality:
+        seasons = rng.choice(list(spec.seasonality), size=samples,
+                             p=np.array(list(spec.seasonality.values())) / sum(spec.seasonality.values()))
+    else:
+        seasons = np.full(samples, m.seasonality)
+    sampled = Market(inflation=rng.normal(m.inflation, spec.inflation_sd, samples),
+                     seasonality=seasons,
+                     shortage=np.clip(rng.normal(m.shortage, spec.shortage_sd, samples), 0.0, 1.0))
+    sigma = np.sqrt(np.log1p(spec.hours_cv ** 2))
+    hour_factor = rng.lognormal(-sigma ** 2 / 2, sigma, (samples, len(base.lines)))
+    material, labor, vat = _base_arrays(base, ctx, scenario)
+    totals = market_totals(material, labor, vat, sampled.material_multiplier(), sampled.labor_multiplier(),
+                           ctx.margin_array(base.budget_mode, sampled.margin_bump(), scenario), hour_factor)
+    return {
+        "samples": samples,
+        "seed": seed,
+        "scenario": scenario,
+        "currency": "EUR",
+        "city": base.city,
+        "tasks": [line["task"] for line in base.lines],
+        "quote_total": finalize_quote(base, ctx, scenario)["totals"]["total_price"],
+        "total_price": _percentiles(totals["total_price"]),
+        "net_price": _percentiles(totals["net_price"]),
+    }
+
+def sweep_market(transcript: str, grid: dict, market: Market | None = None, scenario: str = "mid",
+                 ref: ReferenceData | None = None) -> list[dict]:
+    """
+    Sensitivity table over a Market parameter grid, e.g.
+    {"inflation": [0, .05, .1], "shortage": [0, .5], "seasonality": ["off", "peak"]}.
+    Fields missing from the grid keep `market`'s value. Task base costs are computed
+    once and every grid cell is priced in one vectorized pass. Returns one row per
+    cell (its market parameters plus net, VAT and total), in grid order.
+    """
+    import numpy as np
+    from pricing_logic.vector_pricing import market_totals
+    ctx = PricingContext(market, scenario, ref)
+    base = quote_base(transcript, ctx)
+    axes = {f: list(grid.get(f, [getattr(ctx.market, f)])) for f in ("inflation", "shortage", "seasonality")}
+    idx = np.meshgrid(*(np.arange(len(v)) for v in axes.values()), indexing="ij")
+    cells = {f: np.asarray(v, dtype=object if f == "seasonality" else "f8")[i.ravel()]
+             for (f, v), i in zip(axes.items(), idx)}
+    cells["seasonality"] = cells["seasonality"].astype(str)
+    swept = Market(**cells)
+    material, labor, vat = _base_arrays(base, ctx, scenario)
+    totals = market_totals(material, labor, vat, swept.material_multiplier(), swept.labor_multiplier(),
+                           ctx.margin_array(base.budget_mode, swept.margin_bump(), scenario))
+    rounded = {k: np.round(v, 2).tolist() for k, v in totals.items()}
+    return [{"inflation": i, "shortage": sh, "seasonality": se, "net_price": n, "vat_amount": va, "total_price": t}
+            for i, sh, se, n, va, t in zip(cells["inflation"].tolist(), cells["shortage"].tolist(),
+                                           cells["seasonality"].tolist(), rounded["net_price"],
+                                           rounded["vat_amount"], rounded["total_price"])]
+
+def price_quotes(transcripts, market: Market | None = None, scenario: str = "mid",
+                 ref: ReferenceData | None = None, ctx: PricingContext | None = None):
+    """
+    Batch entry point: price many transcripts under one shared PricingContext.
+    Yields quotes lazily in input order; city-level lookups are resolved once per
+    distinct city. Quote ids get a sequence suffix so they stay unique in a batch.
+    """
+    ctx = ctx or PricingContext(market, scenario, ref)
+    for i, transcript in enumerate(transcripts):
+        quote = price_quote(transcript, ctx=ctx)
+        quote["quote_id"] = f"{quote['quote_id']}-{i:06d}"
+        yield quote
+
+
 
+_UNSET = object()
 
-def factor_scores(quote: dict) -> dict:
+def factor_scores(quote: dict, history_accept_ratio=_UNSET) -> dict:
     """Return granular trust/confidence factors."""
     z = quote["zones"][0]
     scores = {
@@ -273,19 +570,17 @@ def factor_scores(quote: dict) -> dict:
     if margins and all(0.12 <= m <= 0.30 for m in margins):
         scores["price_reasonability"] = 0.85
     # volatility (penalize if recent feedback shows low acceptance)
-    fb = load_feedback()
-    hist = fb.get("history", [])[-10:]
-    if not hist:
+    accept_ratio = feedback_store().accept_ratio(10) if history_accept_ratio is _UNSET else history_accept_ratio
+    if accept_ratio is None:
         scores["market_volatility"] = 0.7
         scores["historical_accuracy"] = 0.6
     else:
-        accept_ratio = sum(1 for h in hist if h.get("accepted")) / len(hist)
         scores["market_volatility"] = 0.6 + 0.4*accept_ratio
         scores["historical_accuracy"] = 0.5 + 0.5*accept_ratio
     return {k: round(v,2) for k,v in scores.items()}
 
-def advanced_trust_score(quote: dict) -> dict:
-    factors = factor_scores(quote)
+def advanced_trust_score(quote: dict, history_accept_ratio=_UNSET) -> dict:
+    factors = factor_scores(quote, history_accept_ratio)
     overall = round(sum(factors.values())/len(factors), 2)
     return {"score": overall, "factors": factors}
 
@@ -297,7 +592,7 @@ def trust_score(quote: dict) -> float:
     # Supplier anchor: adjust if we have a supplier tile price close to our materials
     for t in z["tasks"]:
         if t["task"] == "tiling_floor":
-            supplier = get_tile_price(z["city"])
+            supplier = supplier_tile_anchor(z["city"])
             mat = t["materials"]["cost"] / max(t["quantity"], 1.0)
             if 0.6 * supplier.unit_price_eur <= mat <= 1.4 * supplier.unit_price_eur:
                 score += 0.1
@@ -370,12 +665,13 @@ def main():
 
     scenarios = ["low","mid","high"] if args.scenario == "all" else [args.scenario]
     outputs = []
-    for scen in scenarios:
-        quote = price_quote(args.transcript, market=market, scenario=scen)
+    quotes = price_scenarios(args.transcript, market=market, scenarios=scenarios)
+    for scen, quote in quotes.items():
         out_path = Path(__file__).resolve().parents[0] / "output" / f"quote_{scen}.json"
-        out_path.write_text(json.dumps(quote, indent=2, ensure_ascii=False))
         csv_path = Path(__file__).resolve().parents[0] / "output" / f"quote_{scen}.csv"
-        export_csv(quote, csv_path)
+        with span("serialize"):
+            out_path.write_text(json.dumps(quote, indent=2, ensure_ascii=False))
+            export_csv(quote, csv_path)
         outputs.append((scen, out_path, csv_path))
         logger.info(f"Generated scenario={scen} json={out_path} csv={csv_path} trust={quote['trust']} totals={quote['totals']}")
 
@@ -0,0 +1,378 @@
+"""
+In-memory feedback store backed by an append-only event log.
+
+Holds the rolling accept/reject window and learned per-city-task multipliers in
+memory so pricing reads never touch disk. Every outcome or realized-hours update
+is an event; events are buffered and appended as JSON lines to
+`<name>_events.jsonl` once `flush_every` writes have accumulated, by a background
+timer `flush_interval` seconds after the first unflushed write, and at exit.
+
+`<name>.json` is a compacted snapshot (EMA multipliers, the acceptance window and
+the log position it covers). Startup loads the snapshot and replays only the log
+tail. Once the tail grows past `compact_bytes` the snapshot is rewritten and the
+covered log is rotated out to `<name>_events.<epoch>.jsonl`, so the live log stays
+small while the full outcome history is kept. A legacy `<name>.json` holding the
+whole history list is moved into the log on first load.
+Appends take an exclusive file lock where available, and each flush first replays
+events appended by other processes, so concurrent writers don't lose events.
+"""
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: appends are still atomic per write, just unlocked
+    fcntl = None
+
+MULT_MIN = 0.85
+MULT_MAX = 1.15
+
+
+class FeedbackStore:
+    def __init__(self, path: Path, flush_every: int = 50, flush_interval: float | None = 5.0,
+                 window: int = 200, compact_bytes: int = 1 << 20):
+        self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.stem + "_events.jsonl")
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self._lock = threading.RLock()
+        self._pending: list[str] = []
+        self._timer: threading.Timer | None = None
+        self.history: deque[dict] = deque(maxlen=window)
+        self.per_city_task: dict[str, dict] = {}
+        self._offset = 0            # log bytes applied to memory
+        self._snapshot_offset = 0   # log bytes covered by the snapshot file
+        self._epoch = 0             # log rotations so far; the live log starts with its epoch header
+        self._load()
+        atexit.register(self.flush)
+
+    def _read_snapshot(self) -> dict:
+        if self.path.exists():
+            try:
+                return json.loads(self.path.read_text())
+            except Exception:
+                return {}
+        return {}
+
+    def _load_snapshot(self) -> dict:
+        fb = self._read_snapshot()
+        self.history.clear()
+        self.history.extend(fb.get("history", []))
+        self.per_city_task = {k: dict(v) for k, v in fb.get("per_city_task", {}).items()}
+        self._offset = self._snapshot_offset = int(fb.get("log_offset", 0))
+        self._epoch = int(fb.get("log_epoch", 0))
+        return fb
+
+    def _load(self):
+        fb = self._load_snapshot()
+        if fb.get("history") and "log_offset" not in fb:
+            self._migrate_legacy()
+        elif self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                self._replay(f)
+
+    def _migrate_legacy(self):
+        # legacy files hold the full history list; move it into the log (ahead of any events
+        # already there) so nothing is lost when the snapshot keeps only the rolling window
+        with self._locked_log() as f:
+            fb = self._load_snapshot()
+            if "log_offset" in fb:  # another process migrated first
+                self._replay(f)
+                return
+            legacy = "".join(json.dumps({"type": "outcome", "quote_id": h.get("quote_id"),
+                                         "accepted": bool(h.get("accepted")), "ts": h.get("ts")},
+                                        ensure_ascii=False) + "\n" for h in fb["history"])
+            f.seek(0)
+            existing = f.read()
+            f.truncate(0)
+            f.write(legacy.encode("utf-8") + existing)
+            f.flush()
+            self.history.clear()
+            self._replay(f)
+            self._write_snapshot(f)
+
+    @staticmethod
+    def _read_epoch(f) -> tuple[int, int]:
+        """(epoch, header bytes) of the open log; logs from before rotation have no header."""
+        f.seek(0)
+        first = f.readline()
+        if first.endswith(b"\n"):
+            try:
+                ev = json.loads(first)
+            except ValueError:
+                ev = None
+            if isinstance(ev, dict) and ev.get("type") == "epoch":
+                return int(ev["n"]), len(first)
+        return 0, 0
+
+    def _archive_path(self, epoch: int) -> Path:
+        return self.log_path.with_name(f"{self.log_path.stem}.{epoch:06d}.jsonl")
+
+    def _replay(self, f):
+        epoch, _ = self._read_epoch(f)
+        if epoch > self._epoch:
+            # another process rotated the log: start from its snapshot, and catch up from
+            # the archives if it has not written that snapshot yet (or crashed before it)
+            self._load_snapshot()
+            while self._epoch < epoch:
+                archive = self._archive_path(self._epoch)
+                if archive.exists():
+                    with open(archive, "rb") as a:
+                        self._apply_from(a)
+                self._epoch, self._offset = self._epoch + 1, 0
+            for line in self._pending:
+                self._apply(json.loads(line))
+        self._apply_from(f)
+
+    def _apply_from(self, f):
+        f.seek(0, os.SEEK_END)
+        if f.tell() < self._offset:  # log was reset underneath the snapshot
+            self._offset = 0
+        f.seek(self._offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partial write in progress; pick it up next time
+            self._offset += len(line)
+            try:
+                self._apply(json.loads(line))
+            except ValueError:
+                continue
+
+    def _apply(self, ev: dict):
+        if ev.get("type") == "outcome":
+            self.history.append({"quote_id": ev["quote_id"], "accepted": ev["accepted"], "ts": ev["ts"]})
+        elif ev.get("type") == "hours":
+            alpha = ev.get("alpha", 0.2)
+            rec = self.per_city_task.setdefault(ev["key"], {"multiplier": 1.0, "n": 0})
+            rec["multiplier"] = max(MULT_MIN, min(MULT_MAX, (1 - alpha) * rec["multiplier"] + alpha * ev["ratio"]))
+            rec["n"] = rec.get("n", 0) + 1
+
+    def refresh(self):
+        """Apply events other processes appended to the log since this store last read it."""
+        with self._lock:
+            if self.log_path.exists():
+                with open(self.log_path, "rb") as f:
+                    self._replay(f)
+
+    # reads
+    def recent(self, n: int) -> list[dict]:
+        if n <= 0:
+            return []
+        return list(self.history)[-n:]
+
+    def accept_ratio(self, n: int) -> float | None:
+        hist = self.recent(n)
+        if not hist:
+            return None
+        return sum(1 for h in hist if h.get("accepted")) / len(hist)
+
+    def multiplier(self, key: str) -> float:
+        rec = self.per_city_task.get(key)
+        return rec.get("multiplier", 1.0) if rec else 1.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "history": [dict(h) for h in self.history],
+                "per_city_task": {k: dict(v) for k, v in self.per_city_task.items()},
+            }
+
+    # writes
+    def record(self, quote_id: str, accepted: bool, ts: str | None = None):
+        self._emit({"type": "outcome", "quote_id": quote_id, "accepted": accepted,
+                    "ts": ts or datetime.utcnow().isoformat()})
+
+    def learn(self, key: str, ratio: float, alpha: float = 0.2):
+        """Exponential moving average of actual/estimated hours, bounded in [0.85, 1.15]."""
+        self._emit({"type": "hours", "key": key, "ratio": ratio, "alpha": alpha,
+                    "ts": datetime.utcnow().isoformat()})
+        return self.multiplier(key)
+
+    def _emit(self, ev: dict):
+        with self._lock:
+            self._apply(ev)
+            self._pending.append(json.dumps(ev, ensure_ascii=False) + "\n")
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+            elif self._timer is None and self.flush_interval is not None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, snapshot: bool = False):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending and not snapshot:
+                return
+            with self._locked_log() as f:
+                # Events appended by other writers since our last flush
+                self._replay(f)
+                pending, self._pending = self._pending, []
+                f.seek(0, os.SEEK_END)
+                f.write("".join(pending).encode("utf-8"))
+                f.flush()
+                self._offset = f.tell()
+                if snapshot or self._offset - self._snapshot_offset >= self.compact_bytes:
+                    self._write_snapshot(f)
+
+    @contextmanager
+    def _locked_log(self):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "ab+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def compact(self):
+        """Flush buffered events, rewrite the snapshot and rotate the log it now covers."""
+        self.flush(snapshot=True)
+
+    def _write_snapshot(self, f):
+        # Called with the log lock held and the whole log applied. The covered log is
+        # moved to `<name>_events.<epoch>.jsonl` and the live log restarts with a header
+        # for the next epoch; readers that find a newer epoch than their snapshot's
+        # catch up from that archive, so a crash before the snapshot lands loses nothing.
+        epoch, header = self._read_epoch(f)
+        f.seek(0, os.SEEK_END)
+        if f.tell() > header:
+            f.seek(0)
+            self._archive_path(epoch).write_bytes(f.read())
+            f.truncate(0)
+            f.write((json.dumps({"type": "epoch", "n": epoch + 1}) + "\n").encode("utf-8"))
+            f.flush()
+            self._epoch, self._offset = epoch + 1, f.tell()
+        payload = json.dumps({
+            "history": list(self.history),
+            "per_city_task": self.per_city_task,
+            "log_offset": self._offset,
+            "log_epoch": self._epoch,
+        })
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + f".{os.getpid()}.tmp")
+        tmp.write_text(payload)
+        os.replace(tmp, self.path)
+        self._snapshot_offset = self._offset
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+
+
+class SQLiteFeedbackStore:
+    """
+    Same interface as FeedbackStore, backed by SQLite in WAL mode for deployments
+    where several engine workers share one feedback database. EMA updates are a
+    single upsert, so concurrent learners never overwrite each other, and
+    "last N outcomes" reads walk the history rowid index backwards.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        quote_id TEXT NOT NULL,
+        accepted INTEGER NOT NULL,
+        ts TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_history_quote_id ON history(quote_id);
+    CREATE TABLE IF NOT EXISTS per_city_task (
+        key TEXT PRIMARY KEY,
+        multiplier REAL NOT NULL,
+        n INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, path: Path, timeout: float = 5.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def refresh(self):
+        # reads go straight to the database; nothing to catch up on
+        pass
+
+    # reads
+    def recent(self, n: int) -> list[dict]:
+        if n <= 0:
+            return []
+        rows = self._conn().execute(
+            "SELECT quote_id, accepted, ts FROM history ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+        return [{"quote_id": q, "accepted": bool(a), "ts": ts} for q, a, ts in reversed(rows)]
+
+    def accept_ratio(self, n: int) -> float | None:
+        total, accepted = self._conn().execute(
+            "SELECT count(*), sum(accepted) FROM (SELECT accepted FROM history ORDER BY id DESC LIMIT ?)",
+            (n,)).fetchone()
+        return accepted / total if total else None
+
+    def multiplier(self, key: str) -> float:
+        row = self._conn().execute("SELECT multiplier FROM per_city_task WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 1.0
+
+    def snapshot(self) -> dict:
+        conn = self._conn()
+        history = [{"quote_id": q, "accepted": bool(a), "ts": ts}
+                   for q, a, ts in conn.execute("SELECT quote_id, accepted, ts FROM history ORDER BY id")]
+        per_city_task = {k: {"multiplier": m, "n": n}
+                         for k, m, n in conn.execute("SELECT key, multiplier, n FROM per_city_task")}
+        return {"history": history, "per_city_task": per_city_task}
+
+    # writes
+    def record(self, quote_id: str, accepted: bool, ts: str | None = None):
+        self._conn().execute("INSERT INTO history (quote_id, accepted, ts) VALUES (?, ?, ?)",
+                             (quote_id, int(bool(accepted)), ts or datetime.utcnow().isoformat()))
+
+    def learn(self, key: str, ratio: float, alpha: float = 0.2):
+        """Exponential moving average of actual/estimated hours, bounded in [0.85, 1.15]."""
+        conn = self._conn()
+        keep = 1 - alpha
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO per_city_task (key, multiplier, n) VALUES (?, max(?, min(?, ? * 1.0 + ? * ?)), 1) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "multiplier = max(?, min(?, ? * multiplier + ? * ?)), n = n + 1",
+                (key, MULT_MIN, MULT_MAX, keep, alpha, ratio, MULT_MIN, MULT_MAX, keep, alpha, ratio))
+            value = conn.execute("SELECT multiplier FROM per_city_task WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def flush(self, snapshot: bool = False):
+        # every write is committed immediately; nothing is buffered
+        if snapshot:
+            self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def compact(self):
+        self.flush(snapshot=True)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,134 @@
+"""
+Lightweight span timing for the pricing path.
+
+`with span("parse"): ...` records the block's wall time into an in-process
+histogram registry when instrumentation is enabled (PRICING_TIMINGS=1 or
+`enable()`), and into the current per-quote collector when one is active
+(`price_quote(..., timings=True)`). When neither is on, `span()` returns a shared
+no-op context manager, so instrumented code pays one function call per span.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+BUCKETS_MS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000, float("inf"))
+
+_enabled = os.environ.get("PRICING_TIMINGS") == "1"
+_collector: ContextVar[dict | None] = ContextVar("pricing_span_collector", default=None)
+_NULL = nullcontext()
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000.0
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (capped at the observed max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 4),
+            "mean_ms": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50), 4),
+            "p99_ms": round(self.quantile(0.99), 4),
+            "max_ms": round(self.max, 4),
+        }
+
+
+class SpanRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hists: dict[str, Histogram] = {}
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            h = self._hists.get(name)
+            if h is None:
+                h = self._hists[name] = Histogram()
+            h.observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: h.snapshot() for name, h in sorted(self._hists.items())}
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+
+
+REGISTRY = SpanRegistry()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def metrics_snapshot() -> dict:
+    """Histogram summary per span name, for export to logs or a metrics endpoint."""
+    return {"buckets_ms": [b for b in BUCKETS_MS if b != float("inf")], "spans": REGISTRY.snapshot()}
+
+
+@contextmanager
+def _timed(name: str, collector: dict | None):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        if _enabled:
+            REGISTRY.observe(name, dt)
+        if collector is not None:
+            collector[name] = collector.get(name, 0.0) + dt
+
+
+def span(name: str):
+    collector = _collector.get()
+    if not _enabled and collector is None:
+        return _NULL
+    return _timed(name, collector)
+
+
+@contextmanager
+def collect_timings():
+    """Collect span totals (seconds) for the enclosed block into the yielded dict."""
+    collected: dict[str, float] = {}
+    token = _collector.set(collected)
+    try:
+        yield collected
+    finally:
+        _collector.reset(token)
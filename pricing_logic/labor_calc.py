@@ -34,14 +34,18 @@ def load_task_baselines(path: Path = DATA_PATH):
     return baselines
 
 def estimate(task: str, qty: float, city: str | None, complexity: float = 1.0,
-             rate: LaborRate = LaborRate()) -> tuple[float, float]:
+             rate: LaborRate = LaborRate(), ref=None) -> tuple[float, float]:
     """
     Returns: (labor_cost_eur, hours)
+    `ref` is a ReferenceData registry; the shared process-wide one is used if omitted.
     """
-    base = load_task_baselines().get(task)
+    if ref is None:
+        from pricing_logic.reference_data import get_reference_data
+        ref = get_reference_data()
+    base = ref.baselines.get(task)
     if not base:
         return (0.0, 0.0)
     hours = base["labor_hours_per_unit"] * qty * complexity
-    hours *= city_multiplier(city)
+    hours *= ref.city_multiplier(city)
     cost = hours * rate.base_hourly_eur
     return (cost, hours)
@@ -6,6 +6,9 @@ This module lets you simulate macro effects on pricing:
 - inflation: multiplicative factor on both materials and labor
 - seasonality: e.g., peak season raises labor cost and margin slightly
 - shortage: affects materials more than labor
+
+Fields may also be NumPy arrays (seasonality as an array of strings); the
+multipliers then come back as arrays, one value per sampled market.
 """
 from dataclasses import dataclass
 
@@ -15,6 +18,13 @@ class Market:
     seasonality: str = "neutral"  # "peak", "off", "neutral"
     shortage: float = 0.0    # 0..1 severity applied to materials cost
 
+    def _seasonal(self, peak: float, off: float, neutral: float):
+        if isinstance(self.seasonality, str):
+            return peak if self.seasonality == "peak" else off if self.seasonality == "off" else neutral
+        import numpy as np
+        s = np.asarray(self.seasonality)
+        return np.where(s == "peak", peak, np.where(s == "off", off, neutral))
+
     def material_multiplier(self) -> float:
         m = 1.0 + self.inflation
         m *= (1.0 + 0.10*self.shortage)
@@ -22,16 +32,9 @@ class Market:
 
     def labor_multiplier(self) -> float:
         m = 1.0 + self.inflation*0.6
-        if self.seasonality == "peak":
-            m *= 1.05
-        elif self.seasonality == "off":
-            m *= 0.98
+        m *= self._seasonal(1.05, 0.98, 1.0)
         return m
 
     def margin_bump(self) -> float:
         # small policy bump during peak season to protect backlog
-        if self.seasonality == "peak":
-            return 0.01
-        if self.seasonality == "off":
-            return -0.005
-        return 0.0
+        return self._seasonal(0.01, -0.005, 0.0)
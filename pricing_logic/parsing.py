@@ -0,0 +1,39 @@
+"""
+Transcript field parsing shared by the pricing engine and the ETL silver stage.
+
+Patterns are compiled once at import. Each parser first does a plain substring
+check on the lowercased text for the characters its pattern cannot match without,
+and skips the regex scan entirely when they are absent, which is the common case
+on long transcripts. Callers that already hold `text.lower()` can pass it as `low`.
+"""
+import re
+
+AREA_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:m2|m²|sqm|square meters?)', re.I)
+# fallback for "small 4m²" / "4 m 2" style
+AREA_SPACED_RE = re.compile(r'(\d+(?:\.\d+)?)\s*m\s*[²2]', re.I)
+CITY_RE = re.compile(r'located in ([A-Za-zÀ-ÿ\- ]+)', re.I)
+BUDGET_RE = re.compile(r'budget[- ]?conscious|tight budget|cost sensitive', re.I)
+
+
+def area_m2(text: str, low: str | None = None) -> float | None:
+    low = text.lower() if low is None else low
+    # every area form needs an "m" plus one of "2", "²", "sqm" or "square meter"
+    if "m" not in low or not ("2" in low or "²" in low or "sqm" in low or "square meter" in low):
+        return None
+    m = AREA_RE.search(text) or AREA_SPACED_RE.search(text)
+    return float(m.group(1)) if m else None
+
+
+def city(text: str, low: str | None = None) -> str | None:
+    low = text.lower() if low is None else low
+    if "located in" not in low:
+        return None
+    m = CITY_RE.search(text)
+    return m.group(1).strip() if m else None
+
+
+def budget_conscious(text: str, low: str | None = None) -> bool:
+    low = text.lower() if low is None else low
+    if "budget" not in low and "cost sensitive" not in low:
+        return False
+    return BUDGET_RE.search(text) is not None
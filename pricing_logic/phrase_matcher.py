@@ -0,0 +1,71 @@
+"""
+Aho–Corasick phrase matcher.
+
+Built once from a {label: [phrases]} map, it finds every phrase occurrence in a
+single linear scan of the text, independent of how many phrases the map holds.
+Matching is case-insensitive; offsets refer to the lowercased text.
+"""
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    label: str
+    phrase: str
+    start: int
+    end: int
+
+
+class PhraseMatcher:
+    def __init__(self, phrase_map: dict[str, list[str]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[str, str]]] = [[]]
+        for label, phrases in phrase_map.items():
+            for phrase in phrases:
+                self._add(phrase.lower(), label)
+        self._build_links()
+
+    def _add(self, phrase: str, label: str):
+        if not phrase:
+            return
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((label, phrase))
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str, lowered: bool = False):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text if lowered else text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for label, phrase in out[node]:
+                yield PhraseMatch(label, phrase, i + 1 - len(phrase), i + 1)
+
+    def find_all(self, text: str, lowered: bool = False) -> list[PhraseMatch]:
+        return list(self.iter_matches(text, lowered))
+
+    def labels(self, text: str, lowered: bool = False) -> set[str]:
+        return {m.label for m in self.iter_matches(text, lowered)}
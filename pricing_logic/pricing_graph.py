@@ -1,4 +1,5 @@
 
+import heapq
 from dataclasses import dataclass, field
 from typing import Dict, List
 
@@ -20,41 +21,168 @@ GRAPH: Dict[str, TaskNode] = {
     "painting_walls": TaskNode("painting_walls", requires=[], trade="painting", complexity_weight=0.9),
 }
 
+
+class GraphCycleError(ValueError):
+    def __init__(self, cycle: list[str]):
+        self.cycle = cycle
+        super().__init__("pricing graph has a dependency cycle: " + " -> ".join(cycle))
+
+
+class CompiledGraph:
+    """Dependency index over a task graph, built once.
+
+    A requirement names either a signal (satisfied by the tasks that produce it)
+    or another task. Ordering is Kahn's algorithm with ties broken by declaration
+    order, so results are deterministic; orders and implied-requirement closures
+    are memoized per frozenset of requested tasks.
+    """
+
+    def __init__(self, graph: Dict[str, TaskNode]):
+        self.nodes = dict(graph)
+        self.rank = {k: i for i, k in enumerate(self.nodes)}
+        producers: Dict[str, list[str]] = {}
+        for key, node in self.nodes.items():
+            for sig in node.produces:
+                producers.setdefault(sig, []).append(key)
+        self.producers = {sig: tuple(p) for sig, p in producers.items()}
+        # direct upstream tasks of each node
+        self.upstream: Dict[str, tuple[str, ...]] = {
+            key: tuple(dict.fromkeys(
+                up for req in node.requires
+                for up in ((req,) if req in self.nodes else self.producers.get(req, ()))
+                if up != key))
+            for key, node in self.nodes.items()
+        }
+        self._check_acyclic()
+        self._orders: Dict[frozenset, tuple[str, ...]] = {}
+        self._implied: Dict[frozenset, tuple[str, ...]] = {}
+        self._plans: Dict[frozenset, tuple[tuple[str, tuple[str, ...]], ...]] = {}
+
+    def _key(self, task: str):
+        # declared tasks first in declaration order, unknown ones after, by name
+        return (self.rank.get(task, len(self.rank)), task)
+
+    def _kahn(self, tasks) -> tuple[list[str], set[str]]:
+        present = set(tasks)
+        deps = {t: [u for u in self.upstream.get(t, ()) if u in present] for t in present}
+        indegree = {t: len(d) for t, d in deps.items()}
+        down: Dict[str, list[str]] = {}
+        for t, d in deps.items():
+            for u in d:
+                down.setdefault(u, []).append(t)
+        ready = [self._key(t) for t, n in indegree.items() if n == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, t = heapq.heappop(ready)
+            order.append(t)
+            for v in down.get(t, ()):
+                indegree[v] -= 1
+                if indegree[v] == 0:
+                    heapq.heappush(ready, self._key(v))
+        return order, present.difference(order)
+
+    def _check_acyclic(self):
+        _, stuck = self._kahn(self.nodes)
+        if not stuck:
+            return
+        # walk upstream edges inside the stuck set until a node repeats
+        path, seen = [], {}
+        node = min(stuck, key=self._key)
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(u for u in self.upstream[node] if u in stuck)
+        cycle = path[seen[node]:] + [node]
+        raise GraphCycleError(cycle[::-1])
+
+    def order(self, tasks) -> tuple[str, ...]:
+        """Requested tasks ordered so that every task follows the producers of what it requires."""
+        key = frozenset(tasks)
+        cached = self._orders.get(key)
+        if cached is None:
+            cached = self._orders[key] = tuple(self._kahn(key)[0])
+        return cached
+
+    def implied(self, tasks) -> tuple[str, ...]:
+        """Tasks missing from `tasks` that its requirements pull in, transitively."""
+        key = frozenset(tasks)
+        cached = self._implied.get(key)
+        if cached is None:
+            closure = set(key)
+            stack = list(key)
+            while stack:
+                t = stack.pop()
+                node = self.nodes.get(t)
+                if not node:
+                    continue
+                for req in node.requires:
+                    if req in self.nodes:
+                        candidates = (req,)
+                    else:
+                        candidates = self.producers.get(req, ())
+                    if not candidates or any(c in closure for c in candidates):
+                        continue
+                    closure.add(candidates[0])
+                    stack.append(candidates[0])
+            cached = self._implied[key] = tuple(sorted(closure - key, key=self._key))
+        return cached
+
+    def _plan(self, key: frozenset) -> tuple[tuple[str, tuple[str, ...]], ...]:
+        # (task, predecessors) in order: producers it waits on plus the previous task of its trade
+        plan = self._plans.get(key)
+        if plan is None:
+            last_in_trade: Dict[str, str] = {}
+            steps = []
+            for t in self.order(key):
+                preds = [u for u in self.upstream.get(t, ()) if u in key]
+                trade = self.nodes[t].trade if t in self.nodes else t
+                if trade in last_in_trade and last_in_trade[trade] not in preds:
+                    preds.append(last_in_trade[trade])
+                last_in_trade[trade] = t
+                steps.append((t, tuple(preds)))
+            plan = self._plans[key] = tuple(steps)
+        return plan
+
+    def schedule(self, durations: Dict[str, float]) -> "Schedule":
+        """Earliest-start schedule: tasks of one trade run one after another, different
+        trades in parallel once the signals they require are produced. The makespan is
+        the longest path through that DAG."""
+        start: Dict[str, float] = {}
+        finish: Dict[str, float] = {}
+        via: Dict[str, str | None] = {}
+        for t, preds in self._plan(frozenset(durations)):
+            s, v = 0.0, None
+            for u in preds:
+                if finish[u] > s:
+                    s, v = finish[u], u
+            start[t], finish[t], via[t] = s, s + durations[t], v
+        if not finish:
+            return Schedule(0.0, (), {})
+        end = max(finish, key=finish.get)
+        path = [end]
+        while via[path[-1]] is not None:
+            path.append(via[path[-1]])
+        return Schedule(finish[end], tuple(reversed(path)), {t: (start[t], finish[t]) for t in start})
+
+
+@dataclass(frozen=True)
+class Schedule:
+    makespan: float
+    critical_path: tuple[str, ...]
+    windows: Dict[str, tuple[float, float]]   # task -> (start, finish)
+
+
+# Compiled once from GRAPH; call rebuild_graph() after changing it.
+COMPILED = CompiledGraph(GRAPH)
+
+def rebuild_graph():
+    global COMPILED
+    COMPILED = CompiledGraph(GRAPH)
+
 def topo_sort(tasks: list[str]) -> list[str]:
-    # basic topo: ensure 'requires' come before dependents when applicable
-    order = []
-    seen = set()
-    remaining = set(tasks)
-    guard = 0
-    while remaining and guard < 100:
-        progressed = False
-        for t in list(remaining):
-            node = GRAPH.get(t)
-            if not node:
-                order.append(t); remaining.remove(t); progressed = True; continue
-            if all(req not in GRAPH or req in seen for req in node.requires):
-                order.append(t)
-                seen.add(t)
-                remaining.remove(t)
-                progressed = True
-        if not progressed:
-            # cycle or missing requirements: append remaining as-is
-            order.extend(list(remaining))
-            remaining.clear()
-        guard += 1
-    return order
+    return list(COMPILED.order(tasks))
 
 def implied_requirements(tasks: list[str]) -> list[str]:
-    # For any task that requires a signal, include the producer if absent
-    to_add = []
-    present = set(tasks)
-    signals = {sig: t for t, n in GRAPH.items() for sig in n.produces}
-    for t in tasks:
-        node = GRAPH.get(t)
-        if not node: 
-            continue
-        for req in node.requires:
-            prod = signals.get(req)
-            if prod and prod not in present:
-                to_add.append(prod)
-    return list(dict.fromkeys(to_add))
+    # producers of required signals not already requested, including their own requirements
+    return list(COMPILED.implied(tasks))
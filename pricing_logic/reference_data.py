@@ -0,0 +1,82 @@
+"""
+Process-wide reference data registry.
+
+Materials (`data/materials.json`), labor baselines (`data/price_templates.csv`)
+and the city index are loaded once and shared by every quote in the process.
+Source files are re-stat'ed at most every `check_interval` seconds and reloaded
+when their mtime changes, so edits to the data files are still picked up.
+"""
+import threading
+import time
+from pathlib import Path
+
+from pricing_logic.material_db import MaterialDB, DATA_PATH as MATERIALS_PATH
+from pricing_logic.labor_calc import load_task_baselines, CITY_INDEX, DATA_PATH as BASELINES_PATH
+
+
+def _mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+class ReferenceData:
+    def __init__(self, materials_path: Path = MATERIALS_PATH, baselines_path: Path = BASELINES_PATH,
+                 city_index: dict | None = None, check_interval: float = 1.0):
+        self.materials_path = Path(materials_path)
+        self.baselines_path = Path(baselines_path)
+        self.check_interval = check_interval
+        self.city_index = dict(city_index or CITY_INDEX)
+        self._lock = threading.Lock()
+        self._mtimes = (None, None)
+        self._checked_at = 0.0
+        self.version = 0
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            self.materials = MaterialDB(self.materials_path)
+            self.baselines = load_task_baselines(self.baselines_path)
+            self._mtimes = (_mtime(self.materials_path), _mtime(self.baselines_path))
+            self._checked_at = time.monotonic()
+            self.version += 1
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if a source file changed since the last load. Returns True on reload."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        current = (_mtime(self.materials_path), _mtime(self.baselines_path))
+        if current != self._mtimes:
+            self.reload()
+            return True
+        return False
+
+    def city_multiplier(self, city: str | None) -> float:
+        if not city:
+            return self.city_index["default"]
+        return self.city_index.get(city.strip().lower(), self.city_index["default"])
+
+
+_DEFAULT: ReferenceData | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_reference_data() -> ReferenceData:
+    """Shared registry for the process; created on first use."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT is None:
+                _DEFAULT = ReferenceData()
+    else:
+        _DEFAULT.refresh()
+    return _DEFAULT
+
+
+def set_reference_data(ref: ReferenceData | None):
+    """Swap the shared registry (tests, alternate data roots). None resets it."""
+    global _DEFAULT
+    _DEFAULT = ref
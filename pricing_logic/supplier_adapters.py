@@ -0,0 +1,251 @@
+"""
+Supplier price adapters with an in-process TTL cache.
+
+An adapter fetches `SupplierQuote`s for (sku, city) pairs, singly or in one batch
+call. `CachedSupplier` wraps any adapter: entries younger than `ttl` are served
+from memory, entries older than that but within `stale_ttl` are served stale while
+a background thread refreshes them, and anything older (or never seen) is fetched
+inline. A failed refresh keeps the stale entry. `get_prices([...])` resolves a whole
+batch with at most one adapter call for the misses; adapters' `fetch_many` returns
+only the keys they could price, and only the keys still unpriced fall back to
+expired entries or fail.
+
+The process-wide supplier is the demo stub behind the cache, or an HTTP supplier
+when PRICING_SUPPLIER_URL is set (see `fake_supplier.py` for a local server).
+
+`AnchorResolver` is the async side: it fetches every anchor a quote needs
+concurrently across `AsyncSupplierAdapter`s, bounds each fetch by its adapter's
+timeout, falls back to materials.json prices, and shares one in-flight request
+per (sku, city) between concurrent quotes.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib import request as urlrequest
+from urllib.parse import urlencode
+
+from pricing_logic.supplier_stub import ANCHOR_SKUS, AsyncSupplierAdapter, SupplierQuote, TILE_SKU, get_tile_price
+
+SUPPLIER_URL_ENV = "PRICING_SUPPLIER_URL"
+
+
+class SupplierError(Exception):
+    pass
+
+
+def city_key(city: str | None) -> str:
+    return (city or "").strip().lower()
+
+
+class StubSupplierAdapter:
+    """Demo prices from supplier_stub; only the tile SKU is known."""
+
+    def fetch(self, sku: str, city: str | None) -> SupplierQuote:
+        if sku != TILE_SKU:
+            raise SupplierError(f"unknown sku {sku!r}")
+        return get_tile_price(city)
+
+    def fetch_many(self, keys: list[tuple[str, str | None]]) -> dict:
+        return {(sku, city_key(city)): get_tile_price(city) for sku, city in keys if sku == TILE_SKU}
+
+
+class HTTPSupplierAdapter:
+    """`GET {base}/prices?sku=&city=` and `POST {base}/prices:batch {"items": [{sku, city}]}`."""
+
+    def __init__(self, base_url: str, timeout: float = 2.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, req) -> dict:
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except (OSError, ValueError) as e:
+            raise SupplierError(f"supplier request failed: {e}") from e
+
+    def fetch(self, sku: str, city: str | None) -> SupplierQuote:
+        query = urlencode({"sku": sku, "city": city or ""})
+        return SupplierQuote(**self._call(f"{self.base_url}/prices?{query}"))
+
+    def fetch_many(self, keys: list[tuple[str, str | None]]) -> dict:
+        body = json.dumps({"items": [{"sku": sku, "city": city} for sku, city in keys]}).encode()
+        req = urlrequest.Request(f"{self.base_url}/prices:batch", data=body,
+                                 headers={"Content-Type": "application/json"}, method="POST")
+        prices = self._call(req)["prices"]
+        # the supplier answers null (or an error object) for SKUs it cannot price
+        return {(sku, city_key(city)): SupplierQuote(**p) for (sku, city), p in zip(keys, prices)
+                if p and "error" not in p}
+
+
+class CachedSupplier:
+    def __init__(self, adapter, ttl: float = 300.0, stale_ttl: float = 3600.0, clock=time.monotonic):
+        self.adapter = adapter
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[float, SupplierQuote]] = {}
+        self._refreshing: set[tuple[str, str]] = set()
+        self._pool: ThreadPoolExecutor | None = None
+
+    def _lookup(self, key) -> tuple[SupplierQuote | None, bool]:
+        """(cached quote or None, needs background refresh)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        age = self.clock() - entry[0]
+        if age <= self.ttl:
+            return entry[1], False
+        if age <= self.ttl + self.stale_ttl:
+            return entry[1], True
+        return None, False
+
+    def _store(self, found: dict):
+        now = self.clock()
+        with self._lock:
+            for key, quote in found.items():
+                self._entries[key] = (now, quote)
+
+    def _refresh(self, keys: list):
+        with self._lock:
+            keys = [k for k in keys if k not in self._refreshing]
+            self._refreshing.update(keys)
+            if not keys:
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="supplier-refresh")
+        self._pool.submit(self._run_refresh, keys)
+
+    def _run_refresh(self, keys: list):
+        try:
+            self._store(self.adapter.fetch_many([(sku, city) for sku, city in keys]))
+        except SupplierError:
+            pass  # keep serving the stale entries
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(keys)
+
+    def get_price(self, sku: str, city: str | None) -> SupplierQuote:
+        return self.get_prices([(sku, city)])[(sku, city_key(city))]
+
+    def get_prices(self, keys) -> dict:
+        """{(sku, city_key): SupplierQuote} for every requested (sku, city) pair."""
+        out, missing, stale = {}, {}, []
+        for sku, city in keys:
+            key = (sku, city_key(city))
+            quote, refresh = self._lookup(key)
+            if quote is None:
+                missing[key] = (sku, city)
+            else:
+                out[key] = quote
+                if refresh:
+                    stale.append(key)
+        if stale:
+            self._refresh(stale)
+        if missing:
+            try:
+                found = self.adapter.fetch_many(list(missing.values()))
+            except SupplierError as e:
+                found, error = {}, e
+            else:
+                error = None
+                self._store(found)
+            out.update(found)
+            # expired entries are still better than nothing
+            unresolved = [k for k in missing if k not in found]
+            out.update((k, self._entries[k][1]) for k in unresolved if k in self._entries)
+            unresolved = [k for k in unresolved if k not in out]
+            if unresolved:
+                raise SupplierError(f"no price for {unresolved}") from error
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_supplier: CachedSupplier | None = None
+_supplier_lock = threading.Lock()
+
+
+def get_supplier() -> CachedSupplier:
+    global _supplier
+    if _supplier is None:
+        with _supplier_lock:
+            if _supplier is None:
+                url = os.environ.get(SUPPLIER_URL_ENV)
+                _supplier = CachedSupplier(HTTPSupplierAdapter(url) if url else StubSupplierAdapter())
+    return _supplier
+
+
+def set_supplier(supplier: CachedSupplier | None):
+    """Replace the process-wide supplier (None rebuilds it from the environment on next use)."""
+    global _supplier
+    _supplier = supplier
+
+
+class ThreadedAsyncAdapter:
+    """Runs a blocking adapter (stub, HTTP, cached) in a worker thread behind the async protocol."""
+
+    def __init__(self, adapter, name: str = "supplier", timeout: float = 2.0, skus=None):
+        self.adapter = adapter
+        self.name = name
+        self.timeout = timeout
+        self.skus = set(skus) if skus is not None else None
+
+    def serves(self, sku: str) -> bool:
+        return self.skus is None or sku in self.skus
+
+    async def fetch(self, sku: str, city: str | None) -> SupplierQuote:
+        fetch = self.adapter.get_price if isinstance(self.adapter, CachedSupplier) else self.adapter.fetch
+        return await asyncio.to_thread(fetch, sku, city)
+
+
+class AnchorResolver:
+    def __init__(self, adapters: list[AsyncSupplierAdapter], ref=None):
+        self.adapters = list(adapters)
+        self.ref = ref
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+    def fallback(self, task: str, sku: str, city: str | None) -> SupplierQuote:
+        """Internal materials.json unit price standing in for a missing supplier anchor."""
+        if self.ref is None:
+            from pricing_logic.reference_data import get_reference_data
+            ref = get_reference_data()
+        else:
+            ref = self.ref
+        spec = ref.materials.describe(task)
+        return SupplierQuote(sku, spec.get("material", task), float(spec.get("cost_per_unit", 0.0)), city)
+
+    async def _fetch(self, task: str, sku: str, city: str | None) -> SupplierQuote:
+        for adapter in self.adapters:
+            if adapter.serves(sku):
+                try:
+                    return await asyncio.wait_for(adapter.fetch(sku, city), adapter.timeout)
+                except (asyncio.TimeoutError, SupplierError, OSError):
+                    continue
+        return self.fallback(task, sku, city)
+
+    async def anchor(self, task: str, city: str | None) -> SupplierQuote:
+        sku = ANCHOR_SKUS[task]
+        key = (sku, city_key(city))
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = self._inflight[key] = asyncio.ensure_future(self._fetch(task, sku, city))
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller being cancelled must not cancel the fetch for the others
+        return await asyncio.shield(pending)
+
+    async def resolve(self, tasks, city: str | None) -> dict[str, SupplierQuote]:
+        """{task: anchor} for every task in `tasks` that has a supplier SKU, fetched concurrently."""
+        anchored = [t for t in dict.fromkeys(tasks) if t in ANCHOR_SKUS]
+        quotes = await asyncio.gather(*(self.anchor(t, city) for t in anchored))
+        return dict(zip(anchored, quotes))
@@ -1,6 +1,7 @@
 
-# Supplier API stub (demo). In prod, adapters pull city/postcode SKUs.
+# Supplier API stub (demo). Real suppliers plug in via pricing_logic.supplier_adapters.
 from dataclasses import dataclass
+from typing import Protocol
 
 @dataclass
 class SupplierQuote:
@@ -9,14 +10,33 @@ class SupplierQuote:
     unit_price_eur: float
     city: str | None = None
 
+TILE_SKU = "TILE-STD-01"
+
+# Supplier SKU used as the price anchor for each task that has one
+ANCHOR_SKUS = {
+    "tiling_floor": TILE_SKU,
+    "vanity_install": "VANITY-STD-01",
+    "toilet_replace": "WC-STD-01",
+    "painting_walls": "PAINT-STD-01",
+}
+
+class AsyncSupplierAdapter(Protocol):
+    """Async price source; the resolver gives each fetch at most `timeout` seconds."""
+    name: str
+    timeout: float
+
+    def serves(self, sku: str) -> bool: ...
+
+    async def fetch(self, sku: str, city: str | None) -> SupplierQuote: ...
+
 def get_tile_price(city: str | None) -> SupplierQuote:
     # demo: Marseille slightly cheaper, Paris higher
     base = 27.0
     if not city: 
-        return SupplierQuote("TILE-STD-01", "Standard ceramic tile 30x30", base)
+        return SupplierQuote(TILE_SKU, "Standard ceramic tile 30x30", base)
     c = city.lower()
     if "paris" in c:
-        return SupplierQuote("TILE-STD-01", "Standard ceramic tile 30x30", base * 1.12, city=city)
+        return SupplierQuote(TILE_SKU, "Standard ceramic tile 30x30", base * 1.12, city=city)
     if "marseille" in c:
-        return SupplierQuote("TILE-STD-01", "Standard ceramic tile 30x30", base * 0.96, city=city)
-    return SupplierQuote("TILE-STD-01", "Standard ceramic tile 30x30", base, city=city)
+        return SupplierQuote(TILE_SKU, "Standard ceramic tile 30x30", base * 0.96, city=city)
+    return SupplierQuote(TILE_SKU, "Standard ceramic tile 30x30", base, city=city)
@@ -0,0 +1,115 @@
+"""
+Columnar pricing kernel for batch repricing (e.g. every historical task row after
+a materials.json change). Computes material, labor, net, VAT and gross for whole
+arrays of task rows with NumPy broadcasting.
+
+The arithmetic mirrors the per-task loop in `pricing_engine.price_quote()` step for
+step (same operand order), so results match the scalar path exactly after rounding.
+"""
+import numpy as np
+
+from pricing_logic.vat_rules import vat_for_task
+
+TILE_SUPPLIER_WEIGHT = 0.3
+BUDGET_SPEC_TASKS = ("tiling_floor", "vanity_install", "toilet_replace")
+BUDGET_SPEC_FACTOR = 0.9
+
+TASK_ROW_DTYPE = np.dtype([
+    ("task", "U32"),
+    ("quantity", "f8"),
+    ("material_cost", "f8"),
+    ("labor_hours", "f8"),
+    ("labor_cost", "f8"),
+    ("net_price", "f8"),
+    ("vat_rate", "f8"),
+    ("vat_amount", "f8"),
+    ("total_price", "f8"),
+])
+
+
+def price_task_rows(task, qty, city_index, complexity, *, ref=None, margin=0.18,
+                    material_multiplier=1.0, labor_multiplier=1.0, supplier_unit_price=None,
+                    budget=False, hourly_rate: float = 48.0) -> np.ndarray:
+    """
+    Price task rows in one vectorized pass.
+
+    `task`, `qty`, `city_index` and `complexity` are equal-length arrays. `margin`,
+    `material_multiplier` (market x scenario), `labor_multiplier` (market x scenario),
+    `supplier_unit_price` (tile anchor, used for tiling rows) and `budget` may be
+    scalars or per-row arrays. Returns a structured array of TASK_ROW_DTYPE.
+    """
+    if ref is None:
+        from pricing_logic.reference_data import get_reference_data
+        ref = get_reference_data()
+    task = np.asarray(task, dtype=TASK_ROW_DTYPE["task"])
+    qty = np.asarray(qty, dtype="f8")
+    city_index = np.asarray(city_index, dtype="f8")
+    complexity = np.asarray(complexity, dtype="f8")
+
+    uniq, inv = np.unique(task, return_inverse=True)
+    inv = inv.reshape(task.shape)
+    unit_cost = np.zeros(len(uniq))
+    wastage = np.ones(len(uniq))
+    hours_per_unit = np.zeros(len(uniq))
+    vat_rate = np.zeros(len(uniq))
+    for i, t in enumerate(uniq.tolist()):
+        spec = ref.materials.db.get(t)
+        if spec:
+            unit_cost[i] = spec["cost_per_unit"]
+            wastage[i] = spec.get("wastage_factor", 1.0)
+        base = ref.baselines.get(t)
+        if base:
+            hours_per_unit[i] = base["labor_hours_per_unit"]
+        vat_rate[i] = vat_for_task(t, None)
+
+    material = unit_cost[inv] * qty * wastage[inv]
+    if supplier_unit_price is not None:
+        tiling = task == "tiling_floor"
+        per_unit = material / np.maximum(qty, 1.0)
+        blended = (1 - TILE_SUPPLIER_WEIGHT) * per_unit + TILE_SUPPLIER_WEIGHT * np.asarray(supplier_unit_price, dtype="f8")
+        material = np.where(tiling, blended * qty, material)
+    material = material * material_multiplier
+    cheaper = np.isin(task, BUDGET_SPEC_TASKS) & np.asarray(budget, dtype=bool)
+    material = np.where(cheaper, material * BUDGET_SPEC_FACTOR, material)
+
+    hours = hours_per_unit[inv] * qty * complexity
+    hours = hours * city_index
+    labor = hours * hourly_rate
+    labor = labor * labor_multiplier
+
+    net = (material + labor) * (1.0 + np.asarray(margin, dtype="f8"))
+    rates = vat_rate[inv]
+    vat = net * rates
+    gross = net + vat
+
+    out = np.empty(task.shape, dtype=TASK_ROW_DTYPE)
+    out["task"] = task
+    out["quantity"] = qty
+    out["material_cost"] = material
+    out["labor_hours"] = hours
+    out["labor_cost"] = labor
+    out["net_price"] = net
+    out["vat_rate"] = rates
+    out["vat_amount"] = vat
+    out["total_price"] = gross
+    return out
+
+
+def market_totals(material, labor, vat_rate, material_multiplier, labor_multiplier, margin,
+                  hour_factor=None) -> dict:
+    """
+    Quote totals for many market draws at once.
+
+    `material`, `labor` and `vat_rate` are per-task base values (scenario factors
+    and budget spec already applied); `material_multiplier`, `labor_multiplier` and
+    `margin` are arrays with one entry per draw; `hour_factor` optionally scales each
+    task's labor per draw (draws x tasks). Returns {"net_price", "vat_amount",
+    "total_price"} arrays, one entry per draw.
+    """
+    material = np.multiply.outer(np.asarray(material_multiplier, dtype="f8"), np.asarray(material, dtype="f8"))
+    labor = np.multiply.outer(np.asarray(labor_multiplier, dtype="f8"), np.asarray(labor, dtype="f8"))
+    if hour_factor is not None:
+        labor = labor * hour_factor
+    net = (material + labor) * (1.0 + np.asarray(margin, dtype="f8"))[..., None]
+    vat = net * np.asarray(vat_rate, dtype="f8")
+    return {"net_price": net.sum(axis=-1), "vat_amount": vat.sum(axis=-1), "total_price": (net + vat).sum(axis=-1)}
@@ -0,0 +1,403 @@
+"""
+Asyncio HTTP quoting service (standard library only).
+
+Endpoints (JSON in, JSON out):
+- POST /quote          {"transcript": "...", "scenario": "mid", "market": {...}}
+- POST /quotes:batch   {"transcripts": ["...", ...], "scenario": "mid", "market": {...}}
+- POST /feedback       {"quote_id": "...", "accepted": true}
+                       or {"city": "...", "task": "...", "actual_hours": 5.5, "estimated_hours": 5.0}
+- GET  /health
+
+Pricing is CPU-bound and runs on a process pool whose workers warm the
+reference-data caches once at start-up. Requests wait in a bounded queue; when it
+is full the server answers 503 with Retry-After instead of queueing unboundedly.
+Feedback is recorded in the server process and flushed to the event log; pool
+workers replay new log events at most every `feedback_refresh_s` seconds before
+pricing. `QuoteService(feedback_path=..., feedback_refresh_s=...)` hands both to
+the workers as initializer arguments, so they do not depend on the pool's start
+method. Point PRICING_FEEDBACK_DB at a SQLite file to have workers read every
+write immediately instead. With an
+AnchorResolver (`serve --resolve-anchors`), supplier anchors are fetched on the
+event loop before a job is queued, concurrently and shared between requests for
+the same SKU and city, and handed to the worker with the job together with the
+parsed transcript features, so the worker does not parse again.
+
+Run:      python service.py serve --port 8080 --workers 4
+Load:     python service.py loadgen --port 8080 --requests 500 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+
+from pricing_logic.market import Market
+
+MAX_BODY_BYTES = 8 << 20
+FEEDBACK_REFRESH_S = 1.0
+DEFAULT_TRANSCRIPT = (
+    "Client wants to renovate a small 4m² bathroom. They’ll remove the old tiles, "
+    "redo the plumbing for the shower, replace the toilet, install a vanity, "
+    "repaint the walls, and lay new ceramic floor tiles. Budget-conscious. Located in Marseille."
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _warm_worker(feedback_path: str | None = None, feedback_refresh_s: float = FEEDBACK_REFRESH_S):
+    # Import and load reference data, feedback and the task matcher once per worker process.
+    # Settings arrive as initargs so workers match the server under fork, spawn or forkserver.
+    global _feedback_refresh_s
+    import pricing_engine
+    _feedback_refresh_s = feedback_refresh_s
+    if feedback_path is not None:
+        pricing_engine.set_feedback_store(pricing_engine.FeedbackStore(Path(feedback_path)))
+    pricing_engine.get_reference_data()
+    pricing_engine.feedback_store()
+
+
+def _market(payload: dict) -> Market:
+    m = payload.get("market") or {}
+    try:
+        return Market(inflation=float(m.get("inflation", 0.0)),
+                      seasonality=str(m.get("seasonality", "neutral")),
+                      shortage=float(m.get("shortage", 0.0)))
+    except (TypeError, ValueError) as e:
+        raise HTTPError(400, f"invalid market: {e}")
+
+
+_feedback_refresh_s = FEEDBACK_REFRESH_S
+_last_feedback_refresh = 0.0
+
+
+def _refresh_feedback(store):
+    # feedback is written by the server process; pick up its events at most every _feedback_refresh_s
+    global _last_feedback_refresh
+    now = time.monotonic()
+    if now - _last_feedback_refresh >= _feedback_refresh_s:
+        _last_feedback_refresh = now
+        store.refresh()
+
+
+def price_job(kind: str, payload: dict):
+    """Runs inside a pool worker."""
+    import pricing_engine
+    _refresh_feedback(pricing_engine.feedback_store())
+    ctx = pricing_engine.PricingContext(Market(**payload["market"]), payload["scenario"])
+    for transcript, feats in payload.get("features", ()):
+        ctx.preset_features(transcript, feats)
+    for city, anchors in payload.get("anchors", {}).items():
+        ctx.preset_anchors(city, anchors)
+    if kind == "quote":
+        return pricing_engine.price_quote(payload["transcript"], ctx=ctx)
+    return list(pricing_engine.price_quotes(payload["transcripts"], ctx=ctx))
+
+
+class QuoteService:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, workers: int | None = None,
+                 queue_size: int = 256, concurrency: int | None = None, resolver=None,
+                 feedback_path: Path | None = None, feedback_refresh_s: float = FEEDBACK_REFRESH_S,
+                 mp_context=None):
+        self.host = host
+        self.port = port
+        # workers=0 prices in a thread of this process (handy for tests and debugging)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = queue_size
+        self.concurrency = concurrency or max(1, self.workers) * 2
+        self.resolver = resolver
+        # None keeps pricing_engine's default store (PRICING_FEEDBACK_DB or FEEDBACK_PATH)
+        self.feedback_path = feedback_path
+        self.feedback_refresh_s = feedback_refresh_s
+        self.mp_context = mp_context
+        self.pool: ProcessPoolExecutor | None = None
+        self.server: asyncio.AbstractServer | None = None
+        self._queue: asyncio.Queue | None = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._connections: set[asyncio.Task] = set()
+
+    async def start(self):
+        feedback_path = None if self.feedback_path is None else str(self.feedback_path)
+        # the server process records feedback; workers open the same store and replay it
+        _warm_worker(feedback_path, self.feedback_refresh_s)
+        if self.workers > 0:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context,
+                                            initializer=_warm_worker,
+                                            initargs=(feedback_path, self.feedback_refresh_s))
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.concurrency)]
+        self.server = await asyncio.start_server(self._handle_conn, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+        # drop idle keep-alive connections so their handlers exit cleanly
+        for conn in list(self._connections):
+            conn.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self.server:
+            await self.server.wait_closed()
+        for d in self._dispatchers:
+            d.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    # job queue / backpressure
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            kind, payload, fut = await self._queue.get()
+            try:
+                if not fut.cancelled():
+                    result = await loop.run_in_executor(self.pool, price_job, kind, payload)
+                    if not fut.cancelled():
+                        fut.set_result(result)
+            except Exception as e:
+                if not fut.cancelled():
+                    fut.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _anchors(self, payload: dict, transcripts: list[str]):
+        import pricing_engine
+        feats = {t: pricing_engine.extract_features(t) for t in transcripts}
+        resolved = await asyncio.gather(*(pricing_engine.resolve_anchors(t, self.resolver, f)
+                                          for t, f in feats.items()))
+        anchors = {}
+        for city, found in resolved:
+            anchors.setdefault(city, {}).update(found)
+        payload["features"] = list(feats.items())
+        payload["anchors"] = anchors
+
+    async def _submit(self, kind: str, payload: dict):
+        if self._queue.full():
+            # refuse before spending any parsing or supplier round-trips on the request
+            raise HTTPError(503, "server busy, retry later", {"Retry-After": "1"})
+        if self.resolver is not None:
+            await self._anchors(payload, [payload["transcript"]] if kind == "quote" else payload["transcripts"])
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((kind, payload, fut))
+        except asyncio.QueueFull:
+            raise HTTPError(503, "server busy, retry later", {"Retry-After": "1"})
+        return await fut
+
+    # routes
+    async def route(self, method: str, path: str, body: dict | None):
+        if method == "GET" and path == "/health":
+            return {"status": "ok", "queued": self._queue.qsize(), "workers": self.workers}
+        if method != "POST":
+            raise HTTPError(404 if path not in ("/quote", "/quotes:batch", "/feedback") else 405, "not found")
+        if body is None:
+            body = {}
+        elif not isinstance(body, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        if path == "/quote":
+            transcript = body.get("transcript")
+            if not isinstance(transcript, str):
+                raise HTTPError(400, "'transcript' must be a string")
+            return await self._submit("quote", {"transcript": transcript,
+                                                "scenario": str(body.get("scenario", "mid")),
+                                                "market": vars(_market(body))})
+        if path == "/quotes:batch":
+            transcripts = body.get("transcripts")
+            if not isinstance(transcripts, list) or not all(isinstance(t, str) for t in transcripts):
+                raise HTTPError(400, "'transcripts' must be a list of strings")
+            quotes = await self._submit("batch", {"transcripts": transcripts,
+                                                  "scenario": str(body.get("scenario", "mid")),
+                                                  "market": vars(_market(body))})
+            return {"count": len(quotes), "quotes": quotes}
+        if path == "/feedback":
+            return self._feedback(body)
+        raise HTTPError(404, "not found")
+
+    def _feedback(self, body: dict):
+        import pricing_engine
+        if "quote_id" in body:
+            pricing_engine.record_feedback(str(body["quote_id"]), bool(body.get("accepted")))
+            recorded = "outcome"
+        else:
+            try:
+                pricing_engine.learn_city_task_multiplier(str(body["city"]), str(body["task"]),
+                                                          float(body["actual_hours"]), float(body["estimated_hours"]))
+            except (KeyError, TypeError, ValueError):
+                raise HTTPError(400, "expected quote_id/accepted or city/task/actual_hours/estimated_hours")
+            recorded = "hours"
+        if self.pool is not None:
+            # make the event visible to pool workers right away instead of after the write-behind delay
+            pricing_engine.feedback_store().flush()
+        return {"recorded": recorded}
+
+    # HTTP plumbing
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = line.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload, extra = 200, None, {}
+                try:
+                    try:
+                        length = int(headers.get("content-length", 0))
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        raise HTTPError(400, "invalid Content-Length")
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, "body too large")
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw) if raw else None
+                    except ValueError:
+                        raise HTTPError(400, "body is not valid JSON")
+                    payload = await self.route(method, target.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, e.headers
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                await self._respond(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _respond(self, writer, status: int, payload, keep_alive: bool, headers: dict | None = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(data)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+
+async def request(host: str, port: int, method: str, path: str, body=None, conn=None):
+    """Tiny HTTP/1.1 client for the load generator and tests. Returns (status, json, conn)."""
+    reader, writer = conn or await asyncio.open_connection(host, port)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    raw = await reader.readexactly(int(headers.get("content-length", 0)))
+    if headers.get("connection") == "close":
+        writer.close()
+        return status, json.loads(raw or b"null"), None
+    return status, json.loads(raw or b"null"), (reader, writer)
+
+
+async def load_generate(host: str, port: int, requests: int = 200, concurrency: int = 16,
+                        path: str = "/quote", transcript: str = DEFAULT_TRANSCRIPT) -> dict:
+    """Fire `requests` POSTs over `concurrency` keep-alive connections; report latency percentiles."""
+    latencies, statuses = [], {}
+    remaining = iter(range(requests))
+    body = {"transcripts": [transcript] * 10} if path == "/quotes:batch" else {"transcript": transcript}
+
+    async def client():
+        conn = None
+        for _ in remaining:
+            t0 = time.perf_counter()
+            status, _, conn = await request(host, port, "POST", path, body, conn)
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] = statuses.get(status, 0) + 1
+        if conn:
+            conn[1].close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+    return {"requests": len(latencies), "concurrency": concurrency, "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+            "p50_ms": pct(0.50), "p99_ms": pct(0.99),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2), "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8080)
+    s.add_argument("--workers", type=int, default=None)
+    s.add_argument("--queue-size", type=int, default=256)
+    s.add_argument("--resolve-anchors", action="store_true",
+                   help="fetch supplier anchors concurrently on the event loop before queueing jobs")
+    lg = sub.add_parser("loadgen")
+    lg.add_argument("--host", default="127.0.0.1")
+    lg.add_argument("--port", type=int, default=None, help="target server; omit to spin up a local one")
+    lg.add_argument("--workers", type=int, default=None)
+    lg.add_argument("--requests", type=int, default=200)
+    lg.add_argument("--concurrency", type=int, default=16)
+    lg.add_argument("--path", choices=["/quote", "/quotes:batch"], default="/quote")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        resolver = None
+        if args.resolve_anchors:
+            from pricing_logic.supplier_adapters import AnchorResolver, ThreadedAsyncAdapter, get_supplier
+            resolver = AnchorResolver([ThreadedAsyncAdapter(get_supplier())])
+        asyncio.run(QuoteService(args.host, args.port, args.workers, args.queue_size,
+                                 resolver=resolver).serve_forever())
+        return
+
+    async def run_load():
+        svc = None
+        port = args.port
+        if port is None:
+            svc = await QuoteService(args.host, 0, args.workers).start()
+            port = svc.port
+        try:
+            return await load_generate(args.host, port, args.requests, args.concurrency, args.path)
+        finally:
+            if svc:
+                await svc.stop()
+
+    print(json.dumps(asyncio.run(run_load()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
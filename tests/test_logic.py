@@ -9,3 +9,498 @@ def test_basic_generation(tmp_path: Path = Path(".")):
     assert q["zones"][0]["area_m2"] == 4.0
     assert any(t["task"] == "tiling_floor" for t in q["zones"][0]["tasks"])
     assert q["confidence"]["score"] >= 0.7
+
+def test_reference_data_injected_and_reloaded(tmp_path: Path):
+    from pricing_logic.reference_data import ReferenceData
+    from pricing_logic.material_db import DATA_PATH
+    mats = tmp_path / "materials.json"
+    mats.write_text(DATA_PATH.read_text())
+    ref = ReferenceData(materials_path=mats, check_interval=0.0)
+    tx = "4 m² bathroom; lay new ceramic floor tiles; Located in Marseille."
+    base = price_quote(tx, ref=ref)["totals"]["total_price"]
+    db = json.loads(mats.read_text())
+    db["tiling_floor"]["cost_per_unit"] *= 2
+    mats.write_text(json.dumps(db))
+    import os
+    os.utime(mats, (1, 1))
+    assert ref.refresh() is True
+    assert price_quote(tx, ref=ref)["totals"]["total_price"] > base
+
+def test_feedback_store_event_log(tmp_path: Path):
+    from pricing_logic.feedback_store import FeedbackStore
+    path = tmp_path / "fb.json"
+    store = FeedbackStore(path, flush_every=3, flush_interval=None)
+    store.record("Q-1", True)
+    store.learn("paris::tiling_floor", 2.0)
+    assert not store.log_path.exists()
+    assert store.accept_ratio(5) == 1.0
+    assert store.multiplier("paris::tiling_floor") == 1.15
+    store.record("Q-2", False)
+    assert len(store.log_path.read_text().splitlines()) == 3
+    other = FeedbackStore(path, flush_interval=None)
+    other.record("Q-3", True)
+    other.compact()
+    store.record("Q-4", True)
+    store.flush()
+    reloaded = FeedbackStore(path)
+    assert [h["quote_id"] for h in reloaded.recent(10)] == ["Q-1", "Q-2", "Q-3", "Q-4"]
+    assert reloaded.multiplier("paris::tiling_floor") == 1.15
+    for s in (store, other, reloaded):
+        s.close()
+
+def test_feedback_store_migrates_legacy_history_and_rotates_log(tmp_path: Path):
+    from pricing_logic.feedback_store import FeedbackStore
+    path = tmp_path / "fb.json"
+    legacy = [{"quote_id": f"Q-{i}", "accepted": i % 2 == 0, "ts": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}"}
+              for i in range(300)]
+    path.write_text(json.dumps({"history": legacy, "per_city_task": {"nice::painting_walls": {"multiplier": 1.1, "n": 3}}}))
+    store = FeedbackStore(path, flush_interval=None)
+    assert len(store.recent(1000)) == 200 and store.multiplier("nice::painting_walls") == 1.1
+    archived = (tmp_path / "fb_events.000000.jsonl").read_text().splitlines()
+    assert [json.loads(l)["quote_id"] for l in archived] == [h["quote_id"] for h in legacy]
+    other = FeedbackStore(path, flush_interval=None)
+    store.record("Q-new", True)
+    store.compact()
+    assert len(store.log_path.read_text().splitlines()) == 1  # live log is back to its epoch header
+    other.record("Q-other", False)
+    other.flush()  # notices the rotation, reloads the snapshot and keeps its own event
+    assert [h["quote_id"] for h in FeedbackStore(path).recent(2)] == ["Q-new", "Q-other"]
+    for s in (store, other):
+        s.close()
+
+def test_sqlite_feedback_store_matches_json(tmp_path: Path):
+    from pricing_logic.feedback_store import FeedbackStore, SQLiteFeedbackStore
+    js = FeedbackStore(tmp_path / "fb.json", flush_interval=None)
+    db = SQLiteFeedbackStore(tmp_path / "fb.db")
+    for i, (ok, ratio) in enumerate([(True, 1.3), (False, 0.9), (True, 1.05)]):
+        for s in (js, db):
+            s.record(f"Q-{i}", ok)
+            s.learn("lyon::toilet_replace", ratio)
+    assert db.multiplier("lyon::toilet_replace") == js.multiplier("lyon::toilet_replace")
+    assert [h["quote_id"] for h in db.recent(2)] == [h["quote_id"] for h in js.recent(2)]
+    assert db.accept_ratio(5) == js.accept_ratio(5)
+    js.close(); db.close()
+
+def test_price_quotes_batch_matches_single():
+    from pricing_engine import price_quotes
+    txs = ["4 m² bathroom; lay new ceramic floor tiles; Located in Marseille.",
+           "6 m2 bathroom, replace the toilet and repaint the walls. Located in Paris.",
+           "3 m2, install a vanity. Located in Marseille."]
+    batch = list(price_quotes(iter(txs), scenario="high"))
+    assert len({q["quote_id"] for q in batch}) == len(txs)
+    for tx, q in zip(txs, batch):
+        assert q["totals"] == price_quote(tx, scenario="high")["totals"]
+
+def test_vector_kernel_matches_price_quote():
+    from pricing_engine import scenario_multipliers
+    from pricing_logic.market import Market
+    from pricing_logic.supplier_stub import get_tile_price
+    from pricing_logic.vector_pricing import price_task_rows
+    tx = ("Small 4m² bathroom: remove the old tiles, redo the plumbing for the shower, replace the toilet, "
+          "install a vanity, repaint the walls, lay new ceramic floor tiles. Budget-conscious. Located in Paris.")
+    market = Market(inflation=0.04, seasonality="peak", shortage=0.5)
+    q = price_quote(tx, market=market, scenario="high")
+    zone = q["zones"][0]
+    tasks = zone["tasks"]
+    scen = scenario_multipliers("high")
+    rows = price_task_rows(
+        [t["task"] for t in tasks], [t["quantity"] for t in tasks],
+        [zone["city_index"]] * len(tasks), [1.0] * len(tasks),
+        margin=tasks[0]["pricing"]["margin"],
+        material_multiplier=market.material_multiplier() * scen["material"],
+        labor_multiplier=market.labor_multiplier() * scen["labor"],
+        supplier_unit_price=get_tile_price(zone["city"]).unit_price_eur, budget=True)
+    for t, r in zip(tasks, rows):
+        assert round(float(r["material_cost"]), 2) == t["materials"]["cost"]
+        assert round(float(r["labor_cost"]), 2) == t["labor"]["cost"]
+        assert round(float(r["total_price"]), 2) == t["pricing"]["total_price"]
+
+def test_transcript_features_single_pass():
+    from pricing_engine import extract_features, confidence_score, suspicious_flags
+    tx = "Kitchen and bath refresh, replace the toilet. Tight budget. Located in Lyon"
+    f = extract_features(tx)
+    assert f.area_m2 is None and f.city == "Lyon" and f.budget_conscious
+    assert f.tasks == ("toilet_replace",)
+    assert suspicious_flags(tx) == f.flags == ["Mixed scopes (kitchen+bath) in one room", "Missing area"]
+    assert confidence_score(tx) == confidence_score(tx, f)
+
+def test_phrase_matcher_finds_overlapping_phrases():
+    from pricing_logic.phrase_matcher import PhraseMatcher
+    m = PhraseMatcher({"a": ["floor tiles", "tiles"], "b": ["old tiles", "remove the old tiles"], "c": ["he"]})
+    text = "Please REMOVE the old tiles then lay floor tiles."
+    hits = {(h.label, h.phrase, h.start) for h in m.find_all(text)}
+    low = text.lower()
+    expected = {(lbl, p, i) for lbl, ps in {"a": ["floor tiles", "tiles"], "b": ["old tiles", "remove the old tiles"], "c": ["he"]}.items()
+                for p in ps for i in range(len(low)) if low.startswith(p, i)}
+    assert hits == expected
+
+def test_price_scenarios_matches_individual_quotes():
+    from pricing_engine import price_scenarios
+    from pricing_logic.market import Market
+    tx = "5 m2 bathroom, remove the old tiles and lay new ceramic floor tiles. Located in Lyon."
+    market = Market(inflation=0.03, seasonality="off")
+    quotes = price_scenarios(tx, market=market)
+    assert list(quotes) == ["low", "mid", "high"]
+    for scen, q in quotes.items():
+        single = price_quote(tx, market=market, scenario=scen)
+        assert q["totals"] == single["totals"]
+        assert q["zones"] == single["zones"]
+    assert quotes["low"]["totals"]["total_price"] < quotes["high"]["totals"]["total_price"]
+
+def test_quote_service_endpoints():
+    import asyncio
+    from service import QuoteService, request
+
+    async def run():
+        svc = await QuoteService(port=0, workers=0).start()
+        try:
+            status, q, conn = await request("127.0.0.1", svc.port, "POST", "/quote",
+                                            {"transcript": "4 m2 bathroom, tiling. Located in Paris", "scenario": "high"})
+            assert status == 200 and q["zones"][0]["city"] == "Paris"
+            status, batch, conn = await request("127.0.0.1", svc.port, "POST", "/quotes:batch",
+                                                {"transcripts": ["3 m2 painting", "toilet"]}, conn)
+            assert status == 200 and batch["count"] == 2
+            status, err, conn = await request("127.0.0.1", svc.port, "POST", "/quote", {"text": 1}, conn)
+            assert status == 400
+            status, _, conn = await request("127.0.0.1", svc.port, "GET", "/nope", None, conn)
+            assert status == 404
+            status, _, conn = await request("127.0.0.1", svc.port, "POST", "/quote", [1], conn)
+            assert status == 400
+            conn[1].close()
+            reader, writer = await asyncio.open_connection("127.0.0.1", svc.port)
+            writer.write(b"POST /quote HTTP/1.1\r\nContent-Length: -3\r\nConnection: close\r\n\r\n")
+            assert (await reader.readline()).split()[1] == b"400"
+            writer.close()
+        finally:
+            await svc.stop()
+
+    asyncio.run(run())
+
+def test_pool_workers_see_feedback_posted_to_server(tmp_path: Path):
+    import asyncio
+    import multiprocessing
+    import pricing_engine
+    from service import QuoteService, request
+    tx = "4 m2 bathroom, tiling. Located in Paris"
+
+    async def run():
+        # spawn: the worker inherits no module state, only the initializer arguments
+        svc = await QuoteService(port=0, workers=1, feedback_path=tmp_path / "fb.json", feedback_refresh_s=0.0,
+                                 mp_context=multiprocessing.get_context("spawn")).start()
+        try:
+            _, q, conn = await request("127.0.0.1", svc.port, "POST", "/quote", {"transcript": tx})
+            before = q["zones"][0]["tasks"][0]["pricing"]["margin"]
+            for i in range(5):
+                _, _, conn = await request("127.0.0.1", svc.port, "POST", "/feedback",
+                                           {"quote_id": f"Q-{i}", "accepted": False}, conn)
+            _, q, conn = await request("127.0.0.1", svc.port, "POST", "/quote", {"transcript": tx}, conn)
+            conn[1].close()
+            return before, q["zones"][0]["tasks"][0]["pricing"]["margin"]
+        finally:
+            await svc.stop()
+
+    try:
+        before, after = asyncio.run(run())
+        assert round(before - after, 4) == 0.02
+    finally:
+        pricing_engine.set_feedback_store(None)
+
+def test_service_checks_queue_before_anchors_and_ships_features(monkeypatch):
+    import asyncio
+    import pytest
+    import pricing_engine
+    import service
+    from pricing_logic.supplier_adapters import AnchorResolver, ThreadedAsyncAdapter, StubSupplierAdapter
+    tx = "4 m2 bathroom, tiling. Located in Paris"
+    svc = service.QuoteService(workers=0, queue_size=1,
+                               resolver=AnchorResolver([ThreadedAsyncAdapter(StubSupplierAdapter())]))
+    calls = []
+    svc._anchors = lambda *a: calls.append(a)
+
+    async def submit_when_full():
+        svc._queue = asyncio.Queue(maxsize=1)
+        svc._queue.put_nowait(None)
+        await svc._submit("quote", {"transcript": tx})
+
+    with pytest.raises(service.HTTPError) as e:
+        asyncio.run(submit_when_full())
+    assert e.value.status == 503 and not calls
+    del svc._anchors
+    payload = {"transcripts": [tx, "4 m2 repaint the walls. Located in Paris"], "scenario": "mid", "market": {}}
+    asyncio.run(svc._anchors(payload, payload["transcripts"]))
+    assert "tiling_floor" in payload["anchors"]["Paris"]  # same-city anchors are merged, not replaced
+    # the worker prices from the shipped features and supplier anchors without re-parsing
+    monkeypatch.setattr(pricing_engine, "extract_features", None)
+    monkeypatch.setattr(pricing_engine, "supplier_tile_anchor", None)
+    assert [q["zones"][0]["city"] for q in service.price_job("batch", payload)] == ["Paris", "Paris"]
+
+def test_timings_block_and_metrics_registry():
+    from pricing_logic import instrumentation
+    tx = "4 m² bathroom; lay new ceramic floor tiles; Located in Marseille."
+    assert "_timings" not in price_quote(tx)
+    q = price_quote(tx, timings=True)
+    assert {"parse", "graph", "margin", "task.material", "task.labor", "trust"} <= set(q["_timings"])
+    instrumentation.REGISTRY.reset()
+    instrumentation.enable()
+    try:
+        price_quote(tx)
+    finally:
+        instrumentation.disable()
+    spans = instrumentation.metrics_snapshot()["spans"]
+    assert spans["parse"]["count"] == 1 and spans["task.material"]["count"] >= 2
+
+def test_streaming_etl_jsonl(tmp_path: Path):
+    from etl_pipeline import run_streaming
+    bronze = tmp_path / "bronze.jsonl"
+    txs = ["4 m² bathroom; lay new ceramic floor tiles; Located in Marseille.",
+           "6 m2, replace the toilet. Located in Paris."]
+    bronze.write_text("\n".join(json.dumps({"transcript": t, "meta": {"lead": i}}) for i, t in enumerate(txs)) + "\n\n")
+    stats = run_streaming(bronze, tmp_path / "gold.jsonl", chunk_size=1)
+    assert stats["records"] == 2
+    gold = [json.loads(l) for l in (tmp_path / "gold.jsonl").read_text().splitlines()]
+    assert [g["_etl"]["meta"]["lead"] for g in gold] == [0, 1]
+    assert gold[1]["zones"][0]["city"] == "Paris" and gold[0]["_insights"]["task_count"] >= 1
+
+def test_parallel_gold_ordered_with_failures(tmp_path: Path):
+    from etl_pipeline import run_parallel_gold
+    silver = tmp_path / "silver.jsonl"
+    recs = [{"transcript": f"{3 + i} m2 bathroom, tiling. Located in Lyon", "meta": {"i": i}} for i in range(9)]
+    recs[4] = {"meta": {"i": 4}}  # no transcript -> isolated failure
+    lines = [json.dumps(r) for r in recs]
+    lines[6] = '{"transcript": "4 m2'  # truncated line -> isolated failure
+    silver.write_text("\n".join(lines) + "\n")
+    report = run_parallel_gold(silver, tmp_path / "gold.jsonl", workers=2, chunk_size=2)
+    assert report["written"] == 7 and [f["seq"] for f in report["failures"]] == [4, 6]
+    assert report["failures"][1]["error"].startswith("JSONDecodeError")
+    gold = [json.loads(l) for l in (tmp_path / "gold.jsonl").read_text().splitlines()]
+    assert [g["_etl"]["seq"] for g in gold] == [0, 1, 2, 3, 5, 7, 8]
+    assert gold[0]["zones"][0]["area_m2"] == 3.0
+
+def test_pipeline_config_cached_validated_and_reloaded(tmp_path: Path):
+    import os
+    import pytest
+    from pipeline_config import load_config, CONFIG_PATH
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG_PATH.read_text())
+    cfg = load_config(path)
+    assert load_config(path) is cfg
+    assert cfg.etl.bronze == cfg["etl"]["bronze"] == "data/bronze_raw.json"
+    assert cfg.margin.max == 0.3 and cfg.quality_gate.max_price_change_pct == 25.0
+    path.write_text(path.read_text().replace("max_price_change_pct: 25.0", "max_price_change_pct: 10"))
+    os.utime(path, (1, 1))
+    assert load_config(path).quality_gate.max_price_change_pct == 10.0
+    path.write_text("margin:\n  max: high\n")
+    os.utime(path, (2, 2))
+    with pytest.raises(ValueError, match="margin.max"):
+        load_config(path)
+
+def test_history_store_index_and_lazy_bodies(tmp_path: Path):
+    import shutil
+    import pytest
+    from history_store import HistoryStore
+    from etl_pipeline import compare_with_previous
+    for p in sorted(Path("history").glob("quote_*.json")):
+        shutil.copy(p, tmp_path / p.name)
+    store = HistoryStore(tmp_path, segment_bytes=4096)
+    assert store.count() == 2
+    legacy = json.loads(Path("history/delta_report.json").read_text())
+    assert {k: v for k, v in compare_with_previous(store=store).items() if k in legacy} == legacy
+    newest = sorted(tmp_path.glob("quote_*.json"))[-1]
+    assert compare_with_previous(newest, store=store) == compare_with_previous(store=store)
+    with pytest.raises(TypeError):
+        compare_with_previous(3, store=store)
+    q = price_quote("8 m2 bathroom, tiling and painting. Located in Paris")
+    rec = store.append(q)
+    assert store.latest(1)[0].quote_id == q["quote_id"] and rec.task_key == "demolition_tiles,painting_walls,tiling_floor"
+    assert store.load(store.get(q["quote_id"])) == q
+    assert len(list((tmp_path / "segments").glob("seg_*.jsonl"))) >= 2  # rotated past 4 KB
+    store.close()
+
+def test_comparable_deltas_skip_other_cities_and_sizes(tmp_path: Path):
+    from history_store import HistoryStore
+    from etl_pipeline import compare_with_previous, compare_batch
+    store = HistoryStore(tmp_path)
+    base = "bathroom, lay new ceramic floor tiles and remove old tiles. Located in "
+    recs = store.append_many([
+        price_quote("4 m2 " + base + "Paris"),
+        price_quote("4 m2 " + base + "Marseille"),
+        price_quote("15 m2 " + base + "Paris"),
+        price_quote("4.5 m2 " + base + "Paris"),
+    ])
+    d = compare_with_previous(store=store)
+    assert d["prev_quote_id"] == recs[0].quote_id
+    assert set(d["tasks"]) == {"tiling_floor", "demolition_tiles"} and d["pct_change"] > 0
+    assert not d["exceeds_gate"]
+    batch = compare_batch(recs, store=store)
+    assert [b and b["prev_quote_id"] for b in batch] == [None, None, None, recs[0].quote_id]
+    store.close()
+
+def test_columnar_history_compaction_and_aggregates(tmp_path: Path):
+    from history_store import HistoryStore
+    from history_columnar import ColumnarHistory
+    store = HistoryStore(tmp_path / "history")
+    quotes = [price_quote(f"{a} m2 bathroom, tiling and painting. Located in {c}")
+              for a, c in ((4, "Paris"), (6, "Paris"), (4, "Lyon"))]
+    store.append_many(quotes[:2])
+    col = ColumnarHistory(tmp_path / "columnar")
+    assert col.compact(store) == sum(len(q["zones"][0]["tasks"]) for q in quotes[:2])
+    store.append(quotes[2])
+    col = ColumnarHistory(tmp_path / "columnar")
+    assert col.compact(store) == len(quotes[2]["zones"][0]["tasks"]) and col.compact(store) == 0
+    assert [r.seq for r in store.iter_records(after=col.meta["last_seq"] - 1)] == [col.meta["last_seq"]]
+    assert len(col.meta["parts"]) == 2 and len(col.column("total_price")) == col.meta["rows"]
+    avg = {(r["city"], r["task"]): r for r in col.avg_price_per_task_city()}
+    paris = [t["pricing"]["total_price"] for q in quotes[:2] for t in q["zones"][0]["tasks"] if t["task"] == "painting_walls"]
+    assert avg[("Paris", "painting_walls")]["avg_total_price"] == round(sum(paris) / len(paris), 2)
+    assert col.margin_drift()[0]["drift"] == 0.0
+    store.close()
+
+def test_compiled_graph_order_closure_and_cycles():
+    import pytest
+    from pricing_logic.pricing_graph import CompiledGraph, GraphCycleError, TaskNode, topo_sort, implied_requirements
+    assert topo_sort(["painting_walls", "tiling_floor", "demolition_tiles"]) == ["demolition_tiles", "tiling_floor", "painting_walls"]
+    g = CompiledGraph({
+        "strip": TaskNode("strip", produces=["bare"]),
+        "screed": TaskNode("screed", requires=["bare"], produces=["level"]),
+        "tile": TaskNode("tile", requires=["level"]),
+    })
+    assert g.implied(["tile"]) == ("strip", "screed") and g.order(["tile", "screed", "strip"]) == ("strip", "screed", "tile")
+    assert g.order(["strip", "tile", "screed"]) is g.order(["tile", "screed", "strip"])  # memoized per set
+    assert implied_requirements(["painting_walls"]) == []
+    with pytest.raises(GraphCycleError) as e:
+        CompiledGraph({"a": TaskNode("a", requires=["b"]), "b": TaskNode("b", requires=["a"])})
+    assert set(e.value.cycle) == {"a", "b"}
+
+def test_schedule_makespan_and_critical_path():
+    from pricing_logic.pricing_graph import CompiledGraph, TaskNode
+    g = CompiledGraph({
+        "demo": TaskNode("demo", produces=["bare"], trade="demo"),
+        "pipes": TaskNode("pipes", requires=["bare"], trade="plumbing"),
+        "wc": TaskNode("wc", requires=["bare"], trade="plumbing"),
+        "tile": TaskNode("tile", requires=["bare"], trade="tiling"),
+        "paint": TaskNode("paint", trade="painting"),
+    })
+    s = g.schedule({"demo": 1, "pipes": 2, "wc": 1, "tile": 2, "paint": 5})
+    assert s.windows["wc"] == (3, 4) and s.windows["tile"] == (1, 3)  # plumbing serial, tiling parallel
+    assert s.makespan == 5 and s.critical_path == ("paint",)
+    assert g.schedule({"demo": 1, "pipes": 2, "wc": 1}).critical_path == ("demo", "pipes", "wc")
+    z = price_quote("4 m2 bathroom, remove the old tiles, replace the toilet, repaint the walls. Lyon")["zones"][0]
+    assert z["schedule"]["makespan_days"] <= sum(t["estimated_duration_days"] for t in z["tasks"])
+
+def test_cached_supplier_against_fake_server():
+    from fake_supplier import FakeSupplierServer
+    from pricing_engine import PricingContext
+    from pricing_logic.supplier_adapters import CachedSupplier, HTTPSupplierAdapter
+    from pricing_logic.supplier_stub import TILE_SKU
+    server = FakeSupplierServer().start()
+    now = [0.0]
+    cache = CachedSupplier(HTTPSupplierAdapter(server.url), ttl=10, stale_ttl=100, clock=lambda: now[0])
+    try:
+        server.prices[(TILE_SKU, "paris")] = 40.0
+        prices = cache.get_prices([(TILE_SKU, "Paris"), (TILE_SKU, "Lyon"), ("VANITY-01", "Paris")])
+        assert server.calls == 1 and prices[(TILE_SKU, "paris")].unit_price_eur == 40.0
+        assert cache.get_price(TILE_SKU, " paris ").unit_price_eur == 40.0 and server.calls == 1
+        server.prices[(TILE_SKU, "paris")] = 50.0
+        now[0] = 20.0  # stale: served immediately, refreshed in the background
+        assert cache.get_price(TILE_SKU, "Paris").unit_price_eur == 40.0
+        cache.close()
+        assert cache.get_price(TILE_SKU, "Paris").unit_price_eur == 50.0
+        server.fail = True
+        now[0] = 500.0  # expired and supplier down: last known price still answers
+        assert cache.get_price(TILE_SKU, "Paris").unit_price_eur == 50.0
+        server.fail = False
+        tx = "4 m2 bathroom, lay new ceramic floor tiles. Located in Paris"
+        assert price_quote(tx, ctx=PricingContext(supplier=cache))["totals"]["total_price"] > price_quote(tx)["totals"]["total_price"]
+    finally:
+        cache.close()
+        server.stop()
+
+def test_cached_supplier_resolves_partial_batches():
+    import pytest
+    from pricing_logic.supplier_adapters import CachedSupplier, StubSupplierAdapter, SupplierError
+    from pricing_logic.supplier_stub import TILE_SKU
+    cache = CachedSupplier(StubSupplierAdapter())
+    with pytest.raises(SupplierError, match="VANITY-01"):
+        cache.get_prices([(TILE_SKU, "Paris"), ("VANITY-01", "Paris")])
+    # the tile price found in the failed batch was still cached
+    assert (TILE_SKU, "paris") in cache._entries
+    assert list(cache.get_prices([(TILE_SKU, "Paris")])) == [(TILE_SKU, "paris")]
+
+def test_anchor_resolver_concurrent_dedup_timeout_fallback():
+    import asyncio, time
+    from pricing_engine import PricingContext, resolve_anchors
+    from pricing_logic.supplier_adapters import AnchorResolver
+    from pricing_logic.supplier_stub import SupplierQuote, TILE_SKU
+
+    class SlowAdapter:
+        name, timeout = "slow", 0.5
+        def __init__(self, delay, skus):
+            self.delay, self.skus, self.calls = delay, skus, 0
+        def serves(self, sku):
+            return sku in self.skus
+        async def fetch(self, sku, city):
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return SupplierQuote(sku, "supplier", 30.0, city)
+
+    fast = SlowAdapter(0.1, {TILE_SKU, "WC-STD-01", "PAINT-STD-01"})
+    hung = SlowAdapter(5.0, {"VANITY-STD-01"})
+    resolver = AnchorResolver([fast, hung])
+    tx = "4 m2 bathroom: lay new ceramic floor tiles, replace the toilet, install a vanity, repaint the walls. Located in Paris"
+
+    tasks = ["tiling_floor", "toilet_replace", "vanity_install", "painting_walls", "plumbing_shower"]
+
+    async def run():
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(resolver.resolve(tasks, "Paris") for _ in range(5)))
+        return results, time.perf_counter() - t0
+
+    results, elapsed = asyncio.run(run())
+    assert elapsed < 1.0 and fast.calls == 3 and hung.calls == 1  # concurrent, one fetch per sku/city
+    assert results[0]["vanity_install"].unit_price_eur == 240.0  # timed out -> materials.json
+    assert "plumbing_shower" not in results[0]
+    # quotes only ask for the anchors pricing reads
+    city, anchors = asyncio.run(resolve_anchors(tx, resolver))
+    assert list(anchors) == ["tiling_floor"] and anchors["tiling_floor"].unit_price_eur == 30.0
+    assert fast.calls == 4 and hung.calls == 1
+    ctx = PricingContext()
+    ctx.preset_anchors(city, anchors)
+    assert ctx.supplier_tile_price("Paris").unit_price_eur == 30.0
+
+def test_simulate_quote_percentiles_seeded_and_consistent():
+    import numpy as np
+    import pytest
+    from pricing_engine import simulate_quote, SimulationSpec
+    from pricing_logic.market import Market
+    tx = "4 m2 bathroom, remove the old tiles, replace the toilet, repaint the walls. Located in Lyon"
+    r = simulate_quote(tx, samples=20000, seed=3)
+    assert r == simulate_quote(tx, samples=20000, seed=3)
+    with pytest.raises(ValueError, match="samples"):
+        simulate_quote(tx, samples=0)
+    p = r["total_price"]
+    assert p["p10"] < p["p50"] < p["p90"] and abs(p["p50"] - r["quote_total"]) / r["quote_total"] < 0.03
+    flat = simulate_quote(tx, samples=100, spec=SimulationSpec(0, 0, None, 0), market=Market(0.05, "peak", 0.3))
+    assert flat["total_price"]["p10"] == flat["total_price"]["p90"] == flat["quote_total"]
+    m = Market(np.array([0.0, 0.1]), np.array(["off", "peak"]), np.array([0.0, 0.5]))
+    assert list(m.labor_multiplier()) == [Market(0.0, "off").labor_multiplier(), Market(0.1, "peak").labor_multiplier()]
+
+def test_sweep_market_matches_price_quote_per_cell():
+    from pricing_engine import sweep_market
+    from pricing_logic.market import Market
+    tx = "5 m2 bathroom, lay new ceramic floor tiles, install a vanity. Budget-conscious. Located in Paris"
+    grid = {"inflation": [0.0, 0.05, 0.1], "shortage": [0.0, 0.6], "seasonality": ["off", "neutral", "peak"]}
+    rows = sweep_market(tx, grid, scenario="high")
+    assert len(rows) == 18 and rows[1] == {**rows[1], "inflation": 0.0, "shortage": 0.0, "seasonality": "neutral"}
+    for r in rows:
+        q = price_quote(tx, market=Market(r["inflation"], r["seasonality"], r["shortage"]), scenario="high")
+        assert abs(q["totals"]["total_price"] - r["total_price"]) <= 0.01
+
+def test_shared_parsing_and_silver_area():
+    from pricing_logic import parsing
+    from etl_pipeline import clean_record
+    assert parsing.area_m2("small 4m² bath") == 4.0 and parsing.area_m2("12.5 square meters") == 12.5
+    assert parsing.area_m2("a 3 m 2 room") == 3.0 and parsing.area_m2("no size given, tiles only") is None
+    assert parsing.city("LOCATED IN Aix-en-Provence.") == "Aix-en-Provence"
+    assert parsing.budget_conscious("Tight budget please") and not parsing.budget_conscious("budget is fine")
+    assert clean_record({"transcript": " 6 m2 bathroom in Lyon "})["area_m2"] == 6.0  # was never matched
+    assert clean_record({"transcript": "bathroom", "area_m2": 5})["area_m2"] == 5